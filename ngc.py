@@ -1,30 +1,77 @@
 import argparse
+import os
+import sys
 from os import getcwd
 
+from ngc.batch import Batch
+from ngc.bench import Bench
 from ngc.commands import Command
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('command', nargs='+')
     parser.add_argument('--location', type=str, default=getcwd())
-    args = parser.parse_args()
+    parser.add_argument('--porcelain', action='store_true',
+                        help='print status as JSON lines')
+    parser.add_argument('--renames', action='store_true',
+                        help='detect renamed files in status and diff, porcelain output is then '
+                             'only printed once the walk is done')
+    parser.add_argument('--copies', action='store_true',
+                        help='detect copies of committed files in status and diff')
+    parser.add_argument('--similarity', type=float, default=None,
+                        help='detect modified renames above this similarity, from 0 to 1')
+    parser.add_argument('--output', '-o', type=str, default=None,
+                        help='file to write an archive to instead of stdout')
+    parser.add_argument('--format', type=str, default=None, choices=Command.ARCHIVE_FORMATS,
+                        help='archive format, guessed from the output file name by default')
+    parser.add_argument('--hash', type=str, default=None,
+                        help='hash function of a new repository, e.g. sha256')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only check objects added since the last fsck')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='number of worker processes, or threads for batch')
+    parser.add_argument('--repos', type=argparse.FileType('r'), default=None,
+                        help='file listing repositories for batch, one per line, - for stdin')
+    parser.add_argument('--message', '-m', type=str, default=None,
+                        help='commit message, asked for when not given')
+    # paths after -- limit commands such as log, they can't be told apart
+    # from the other positional arguments once parsed
+    argv, paths = sys.argv[1:], []
+    if '--' in argv:
+        argv, paths = argv[:argv.index('--')], argv[argv.index('--') + 1:]
+    # options may come after the first positional, as in 'batch commit -m msg repo1'
+    args = parser.parse_intermixed_args(argv)
 
+    if args.command[0] == 'clone' and len(args.command) > 2:
+        args.location = args.command[2]
+    elif args.command[0] == 'clone' and len(args.command) > 1:
+        # like git, clone into a new directory named after the source
+        src_name = os.path.basename(os.path.normpath(os.path.abspath(args.command[1])))
+        args.location = os.path.join(args.location, src_name)
     ngc_obj = Command(repo_path=args.location)
 
     if args.command[0] == 'init':
-        ngc_obj.init()
+        ngc_obj.init(hash_name=args.hash)
     elif args.command[0] == 'status':
-        ngc_obj.status()
+        ngc_obj.status(porcelain=args.porcelain, detect_renames=args.renames,
+                       detect_copies=args.copies, similarity=args.similarity)
+    elif args.command[0] == 'diff':
+        ngc_obj.diff(detect_renames=args.renames, detect_copies=args.copies,
+                     similarity=args.similarity)
     elif args.command[0] ==  'commit':
-        commit_message = input("Enter commit message: ")
+        commit_message = args.message
+        if commit_message is None:
+            commit_message = input("Enter commit message: ")
         ngc_obj.commit(message=commit_message)
     elif args.command[0] == 'log':
         if len(args.command) == 1:
-            ngc_obj.log()
+            ngc_obj.log(paths=paths)
         else:
-            ngc_obj.log(commit_hash=args.command[1])
+            ngc_obj.log(commit_hash=args.command[1], paths=paths)
     elif args.command[0] == 'config_user':
         ngc_obj.config_user(user_name=args.command[1], user_email=args.command[2])
+    elif args.command[0] == 'config_repo':
+        ngc_obj.config_repo(key=args.command[1], value=args.command[2])
     elif args.command[0] == 'checkout':
         if len(args.command) > 1:
             ngc_obj.checkout(commit_hash=args.command[1])
@@ -32,5 +79,71 @@ if __name__ == '__main__':
             ngc_obj.checkout()
     elif args.command[0] == 'reset':
         ngc_obj.reset()
+    elif args.command[0] == 'blame':
+        if len(args.command) > 2:
+            ngc_obj.blame(rel_path=args.command[-1], commit_hash=args.command[1])
+        else:
+            ngc_obj.blame(rel_path=args.command[1])
+    elif args.command[0] == 'show':
+        if len(args.command) < 2 or ':' not in args.command[1]:
+            print("Error: Expected <commit>:<path>")
+            sys.exit(2)
+        commit_hash, rel_path = args.command[1].split(':', 1)
+        if commit_hash in ('', 'HEAD'):
+            commit_hash = None
+        if not ngc_obj.show(commit_hash=commit_hash, rel_path=rel_path):
+            sys.exit(1)
+    elif args.command[0] == 'archive':
+        commit_hash = args.command[1] if len(args.command) > 1 else None
+        archive_format = args.format
+        if archive_format is None:
+            archive_format = 'tar'
+            for extension in ('zip', 'tar.gz'):
+                if args.output and args.output.endswith('.' + extension):
+                    archive_format = extension
+        if args.output:
+            with open(args.output, 'wb') as out:
+                ngc_obj.archive(commit_hash=commit_hash, out=out, archive_format=archive_format)
+        else:
+            ngc_obj.archive(commit_hash=commit_hash, archive_format=archive_format)
+    elif args.command[0] == 'clone':
+        ngc_obj.clone(src_path=args.command[1])
+    elif args.command[0] == 'fetch':
+        ngc_obj.fetch(src_path=args.command[1])
+    elif args.command[0] == 'fast-import':
+        if len(args.command) > 1:
+            with open(args.command[1], 'rb') as stream:
+                ngc_obj.fast_import(stream=stream)
+        else:
+            ngc_obj.fast_import()
+    elif args.command[0] == 'fsck':
+        if ngc_obj.fsck(incremental=args.incremental, jobs=args.jobs):
+            sys.exit(1)
+    elif args.command[0] == 'batch':
+        if len(args.command) < 2 or args.command[1] not in Batch.OPERATIONS:
+            print("Error: Batch operation not recognized")
+            sys.exit(2)
+        repo_paths = args.command[2:]
+        if args.repos:
+            repo_paths += Batch.read_repo_paths(args.repos)
+        commit_message = args.message
+        if args.command[1] == Batch.COMMIT and commit_message is None:
+            commit_message = input("Enter commit message: ")
+        if Batch(repo_paths, jobs=args.jobs).run(args.command[1], message=commit_message):
+            sys.exit(1)
+    elif args.command[0] == 'bench':
+        if len(args.command) > 1 and args.command[1] == 'compress':
+            Bench(repo_path=args.location).compress()
+        elif len(args.command) > 1 and args.command[1] == 'hash':
+            Bench(repo_path=args.location).hashing()
+        else:
+            print("Error: Benchmark not recognized")
+    elif args.command[0] == 'sparse':
+        if len(args.command) > 1 and args.command[1] == 'set':
+            ngc_obj.set_sparse(patterns=args.command[2:])
+        elif len(args.command) > 1 and args.command[1] == 'disable':
+            ngc_obj.disable_sparse()
+        else:
+            ngc_obj.list_sparse()
     else:
         print("Error: Command not recognized")
@@ -0,0 +1,184 @@
+import asyncio
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .blame import Blame
+from .commands import Command
+
+log = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def shared_executor():
+    """ Get the thread pool shared by all repositories which weren't given one. """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(thread_name_prefix='ngc')
+        return _executor
+
+
+class _Stopped(Exception):
+    """ Raised in a producer thread once the consumer of its stream went away. """
+
+
+class _QueueWriter:
+    """ Binary file object handing whatever is written to it over to a stream. """
+
+    def __init__(self, emit):
+        self.emit = emit
+
+    def write(self, data):
+        self.emit(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+class AsyncRepository:
+    """
+    Asyncio facade over Command for use from an event loop. The blocking
+    work runs on an executor, shared by default, and the Command with its
+    object store stays loaded between calls. Operations moving HEAD are
+    serialized, streamed results are handed over through a bounded queue
+    as they are produced, so a slow consumer holds the producer back.
+    """
+
+    QUEUE_SIZE = 64
+
+    def __init__(self, repo_path=None, executor=None):
+        if not repo_path: repo_path = os.getcwd()
+        self.repo_path = repo_path
+        self.executor = executor
+        self._command = None
+        # created on first use, as a lock made outside of a coroutine is
+        # bound to whichever event loop was current then before Python 3.10
+        self._lock = None
+
+    async def command(self):
+        """
+        Get the Command of the repository, loading it on first use. HEAD is
+        read again every time, as other processes may have committed since.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        if self._command is None:
+            self._command = await self._run(Command, self.repo_path)
+        else:
+            await self._run(self._command.refresh_head)
+        return self._command
+
+    async def init(self, hash_name=None):
+        cmd = await self.command()
+        async with self._lock:
+            await self._run(cmd.init, hash_name=hash_name)
+
+    async def status(self, detect_renames=False, detect_copies=False, similarity=None):
+        """
+        Generate Change records of the working tree as the walk finds them.
+        Detecting renames holds added and deleted files back until the end.
+        """
+        cmd = await self.command()
+
+        def produce(emit):
+            for change in cmd.iter_status(detect_renames=detect_renames, detect_copies=detect_copies,
+                                          similarity=similarity):
+                emit(change)
+
+        async for change in self._stream(produce):
+            yield change
+
+    async def commit(self, message):
+        """ Commit the working tree, returning the new commit hash or None without changes. """
+        cmd = await self.command()
+        async with self._lock:
+            return await self._run(cmd.commit, message)
+
+    async def checkout(self, commit_hash=None):
+        cmd = await self.command()
+        async with self._lock:
+            await self._run(cmd.checkout, commit_hash)
+
+    async def reset(self):
+        cmd = await self.command()
+        async with self._lock:
+            await self._run(cmd.reset)
+
+    async def show(self, commit_hash, rel_path):
+        """
+        Generate the content of a file as of a commit in chunks of bytes.
+        Raises FileNotFoundError if the path isn't in the commit.
+        """
+        cmd = await self.command()
+        if commit_hash is None: commit_hash = cmd.head
+        if commit_hash is None:
+            raise FileNotFoundError(f"No commits to show {rel_path} from")
+
+        def produce(emit):
+            cmd.write_path(commit_hash, rel_path, out=_QueueWriter(emit))
+
+        async for chunk in self._stream(produce):
+            yield chunk
+
+    async def blame(self, rel_path, commit_hash=None):
+        """ Get (commit hash, line) for every line of a file, None if it doesn't exist. """
+        cmd = await self.command()
+        if commit_hash is None: commit_hash = cmd.head
+        if commit_hash is None: return None
+
+        def blame():
+            return Blame(self.repo_path).run(commit_hash, rel_path)
+
+        return await self._run(blame)
+
+    async def _run(self, func, *args, **kwargs):
+        """ Run a blocking call on the executor. """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor or shared_executor(),
+                                          functools.partial(func, *args, **kwargs))
+
+    async def _stream(self, produce):
+        """
+        Run produce(emit) on the executor and yield every item it emits as
+        soon as it is available. Exceptions of produce are raised here once
+        the items before them were consumed.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(self.QUEUE_SIZE)
+        stopped = threading.Event()
+        done = object()
+
+        def emit(item):
+            if stopped.is_set():
+                raise _Stopped()
+            # blocks the producer thread while the queue is full
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        def run():
+            try:
+                produce(emit)
+            except _Stopped:
+                pass
+            finally:
+                if not stopped.is_set():
+                    asyncio.run_coroutine_threadsafe(queue.put(done), loop).result()
+
+        future = loop.run_in_executor(self.executor or shared_executor(), run)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                yield item
+            await future
+        finally:
+            if not future.done():
+                # the consumer stopped early, unblock the producer and let it stop
+                stopped.set()
+                while not queue.empty():
+                    queue.get_nowait()
@@ -0,0 +1,85 @@
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import redirect_stdout
+
+from .commands import Command
+
+log = logging.getLogger(__name__)
+
+
+class Batch:
+    """
+    Run status or commit over many repositories from one process, on a
+    thread pool, writing one JSON line per repository as it finishes.
+    Hashing and compression release the GIL, so threads overlap well on
+    file I/O and the interpreter is only started once.
+    Status lines list Change records as dicts, with new_hash None for
+    files modified against a chunked blob, see Change.
+    """
+
+    STATUS = 'status'
+    COMMIT = 'commit'
+    OPERATIONS = (STATUS, COMMIT)
+
+    def __init__(self, repo_paths, jobs=None):
+        self.repo_paths = list(repo_paths)
+        self.jobs = jobs
+
+    @staticmethod
+    def read_repo_paths(list_file):
+        """ Read repository paths from a file object, one per line, skipping blank lines. """
+        return [line.strip() for line in list_file if line.strip()]
+
+    def run(self, operation, message=None, out=None):
+        """
+        Run an operation on every repository, writing results as JSON lines
+        to out, stdout by default. Returns the number of repositories that
+        failed. Commits need a message.
+        """
+        if operation not in self.OPERATIONS:
+            raise ValueError(f"Unknown batch operation: {operation}")
+        if operation == self.COMMIT and message is None:
+            raise ValueError("A commit message is required for batch commit")
+        if out is None: out = sys.stdout
+
+        failures = 0
+        # commands report through print, which would interleave with the
+        # results, so their output is dropped for the whole run; stdout is
+        # redirected here once since redirect_stdout isn't thread safe
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                futures = [executor.submit(self._run_repo, operation, repo_path, message)
+                           for repo_path in self.repo_paths]
+                for future in as_completed(futures):
+                    result = future.result()
+                    if 'error' in result:
+                        failures += 1
+                    out.write(json.dumps(result) + "\n")
+                    out.flush()
+
+        return failures
+
+    def _run_repo(self, operation, repo_path, message):
+        """ Run an operation on a single repository and return its result record. """
+        result = {'repo': repo_path, 'operation': operation}
+        start = time.perf_counter()
+
+        try:
+            if not os.path.exists(os.path.join(repo_path, '.ngc')):
+                raise FileNotFoundError(f"Not an ngc repository: {repo_path}")
+            cmd = Command(repo_path)
+            if operation == self.STATUS:
+                result['head'] = cmd.head
+                result['changes'] = [change._asdict() for change in cmd.iter_status()]
+            else:
+                result['commit'] = cmd.commit(message)
+        except Exception as err:
+            log.debug("Batch %s failed in %s", operation, repo_path, exc_info=True)
+            result['error'] = str(err)
+
+        result['seconds'] = round(time.perf_counter() - start, 6)
+        return result
@@ -0,0 +1,111 @@
+import hashlib
+import logging
+import os
+import time
+
+from . import compression
+from .config import RepoFormat
+
+log = logging.getLogger(__name__)
+
+class Bench:
+    """
+    Benchmarks run against a sample of the working tree, to help picking
+    repository settings that suit the data at hand.
+    """
+
+    SAMPLE_SIZE = 32 * 1024 * 1024
+    FILE_SAMPLE_SIZE = 1024 * 1024
+    COMPRESSION_LEVELS = {
+        compression.GZIP: (1, 6, 9),
+        compression.ZLIB: (1, 6, 9),
+        compression.LZMA: (0, 6),
+        compression.BZ2: (1, 9),
+        compression.NONE: (None,),
+    }
+
+    # hashing is repeated over the sample for at least this many seconds
+    HASH_MIN_TIME = 0.5
+
+    def __init__(self, repo_path=None):
+        if not repo_path: repo_path = os.getcwd()
+        self.repo_path = repo_path
+
+    def compress(self):
+        """ Report compression ratio against throughput for each codec and level. """
+        samples = self._sample_working_tree()
+        total_size = sum(len(sample) for sample in samples)
+        if not total_size:
+            print("No files to sample in the working tree.")
+            return
+
+        print(f"Sampled {total_size} bytes from {len(samples)} files.")
+        print(f"{'codec':<6} {'level':>5} {'ratio':>7} {'compress MB/s':>14} {'extract MB/s':>13}")
+
+        for codec in compression.CODECS:
+            for level in self.COMPRESSION_LEVELS[codec]:
+                compressed_size = 0
+                compress_time = extract_time = 0.0
+
+                for sample in samples:
+                    start = time.perf_counter()
+                    compressed = compression.compress(sample, codec, level)
+                    compress_time += time.perf_counter() - start
+
+                    start = time.perf_counter()
+                    compression.decompress(compressed)
+                    extract_time += time.perf_counter() - start
+                    compressed_size += len(compressed)
+
+                print(f"{codec:<6} {str(level):>5} {total_size / compressed_size:>7.2f} "
+                      f"{self._throughput(total_size, compress_time):>14.1f} "
+                      f"{self._throughput(total_size, extract_time):>13.1f}")
+
+    def hashing(self):
+        """ Report the throughput of each hash function a repository can use. """
+        samples = self._sample_working_tree()
+        total_size = sum(len(sample) for sample in samples)
+        if not total_size:
+            print("No files to sample in the working tree.")
+            return
+
+        print(f"Sampled {total_size} bytes from {len(samples)} files.")
+        print(f"{'hash':<9} {'bits':>5} {'MB/s':>10}")
+
+        for hash_name in RepoFormat.HASH_FUNCTIONS:
+            if hash_name not in hashlib.algorithms_available:
+                continue
+            hashed_size = 0
+            start = time.perf_counter()
+
+            while time.perf_counter() - start < self.HASH_MIN_TIME:
+                for sample in samples:
+                    hashf = hashlib.new(hash_name)
+                    hashf.update(sample)
+                    hashf.hexdigest()
+                hashed_size += total_size
+
+            elapsed = time.perf_counter() - start
+            print(f"{hash_name:<9} {hashf.digest_size * 8:>5} {self._throughput(hashed_size, elapsed):>10.1f}")
+
+    def _sample_working_tree(self):
+        """ Read the leading bytes of working tree files up to SAMPLE_SIZE in total. """
+        samples = list()
+        remaining = self.SAMPLE_SIZE
+
+        for dirpath, dirnames, filenames in os.walk(self.repo_path):
+            dirnames[:] = [dirname for dirname in dirnames if not dirname.startswith(".")]
+            for file in sorted(filenames):
+                if file.startswith(".") or remaining <= 0:
+                    continue
+                with open(os.path.join(dirpath, file), 'rb') as f_in:
+                    sample = f_in.read(min(self.FILE_SAMPLE_SIZE, remaining))
+                if sample:
+                    samples.append(sample)
+                    remaining -= len(sample)
+
+        return samples
+
+    def _throughput(self, size, elapsed):
+        """ Megabytes per second, guarding against timer resolution. """
+        return size / (1024 * 1024) / max(elapsed, 1e-9)
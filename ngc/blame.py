@@ -0,0 +1,117 @@
+import json
+import logging
+import os
+
+from . import objects
+from .diff import Diff
+from .objects import BLOB
+
+log = logging.getLogger(__name__)
+
+
+class Blame:
+    """
+    Line-level history of a file. The history is walked from a commit back
+    through its parents, comparing only the blob hash of the file, so the
+    commits that left it alone cost a few tree reads each. Lines are then
+    carried back one version at a time until every line has an origin.
+    Line matches between two blobs never change, so they are cached in
+    .ngc/cache/blame under the names of both blobs.
+    """
+
+    def __init__(self, repo_path=None):
+        if not repo_path: repo_path = os.getcwd()
+        self.repo_path = repo_path
+        self.cache_path = os.path.join(repo_path, '.ngc/cache/blame')
+        self.obj_tree = objects.Tree(repo_path)
+        self.obj_commit = objects.Commit(repo_path)
+        self.obj_blob = self.obj_tree.blob
+
+    def run(self, commit_hash, rel_path):
+        """
+        Find the commit each line of a file comes from, as of commit_hash.
+        Returns a list of (commit hash, line) with lines as bytes, or None
+        if the file doesn't exist in that commit.
+        """
+        versions = self.versions(commit_hash, rel_path)
+        if not versions:
+            return None
+
+        lines = self._get_lines(versions[0][1])
+        origins = [None] * len(lines)
+        # line numbers in the version being looked at -> line numbers at commit_hash
+        pending = {line_no: line_no for line_no in range(len(lines))}
+
+        for (version_commit, blob_hash), older in zip(versions, versions[1:] + [None]):
+            if older is None:
+                for line_no in pending.values():
+                    origins[line_no] = version_commit
+                break
+
+            # lines without a match in the older version were added here
+            older_line_nos = dict()
+            for old_start, new_start, length in self._match(older[1], blob_hash):
+                for offset in range(length):
+                    older_line_nos[new_start + offset] = old_start + offset
+
+            older_pending = dict()
+            for version_line_no, line_no in pending.items():
+                if version_line_no in older_line_nos:
+                    older_pending[older_line_nos[version_line_no]] = line_no
+                else:
+                    origins[line_no] = version_commit
+            pending = older_pending
+            if not pending:
+                break
+
+        return list(zip(origins, lines))
+
+    def versions(self, commit_hash, rel_path):
+        """
+        List the versions of a file, newest first, as (commit hash, blob
+        hash) of the commit which introduced each one. The walk stops at
+        the first commit without the file.
+        """
+        versions = list()
+        blob_hash = self._get_blob_hash(commit_hash, rel_path)
+        if blob_hash is None:
+            return versions
+
+        while True:
+            parent_hash = self.obj_commit.get_commit_dict_from_file(commit_hash).get(self.obj_commit.PARENT)
+            parent_blob_hash = None
+            if parent_hash is not None:
+                parent_blob_hash = self._get_blob_hash(parent_hash, rel_path)
+
+            if parent_blob_hash != blob_hash:
+                versions.append((commit_hash, blob_hash))
+                if parent_blob_hash is None:
+                    return versions
+            commit_hash, blob_hash = parent_hash, parent_blob_hash
+
+    def _get_blob_hash(self, commit_hash, rel_path):
+        """ Get the blob hash of a file in a commit, None if it isn't a file there. """
+        kind, obj_hash = self.obj_tree.resolve_path(self.obj_commit.get_tree_hash(commit_hash), rel_path)
+        return obj_hash if kind == BLOB else None
+
+    def _get_lines(self, blob_hash):
+        """ Read the lines of a blob as bytes. """
+        with self.obj_blob.open_content(os.path.join(self.obj_tree.objects_path, blob_hash)) as f_in:
+            return f_in.read().splitlines(keepends=True)
+
+    def _match(self, old_hash, new_hash):
+        """ Get the matching line runs between two blobs, from the cache if possible. """
+        cached_path = os.path.join(self.cache_path, f"{old_hash}-{new_hash}")
+        try:
+            with open(cached_path, 'r') as cached_file:
+                return json.load(cached_file)
+        except (FileNotFoundError, ValueError):
+            pass
+
+        runs = Diff().match_lines(self._get_lines(old_hash), self._get_lines(new_hash))
+        log.debug("Matched %s against %s, caching %d runs" % (new_hash, old_hash, len(runs)))
+
+        os.makedirs(self.cache_path, exist_ok=True)
+        with self.obj_blob.atomic_write(cached_path) as cached_file:
+            cached_file.write(json.dumps(runs).encode())
+        return runs
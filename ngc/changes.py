@@ -0,0 +1,141 @@
+import logging
+import os
+import zlib
+from collections import namedtuple
+
+log = logging.getLogger(__name__)
+
+ADDED = 'added'
+MODIFIED = 'modified'
+DELETED = 'deleted'
+RENAMED = 'renamed'
+COPIED = 'copied'
+
+# A single change in the working tree. Paths are relative to the repository
+# root and use '/' as separator; hashes are None where they don't apply.
+# The new hash of a file modified against a chunked blob is None as well,
+# the comparison stops at the first chunk that differs.
+# old_path is set for renamed and copied files only.
+Change = namedtuple('Change', ['path', 'kind', 'old_hash', 'new_hash', 'old_path'], defaults=(None,))
+
+class RenameDetector:
+    """
+    Pairs the deleted and added files of a status walk into renames and
+    copies. Exact renames and copies are found by looking up blob hashes
+    in an index of the committed files. Renames with modifications are
+    optionally found by comparing sampled line fingerprints of the
+    remaining files, instead of diffing them.
+    """
+
+    # files are fingerprinted from their first bytes only
+    FINGERPRINT_MAX_SIZE = 4 * 1024 * 1024
+    # files with more lines than this keep only every SAMPLE_RATE'th line hash
+    SAMPLE_MIN_LINES = 64
+    SAMPLE_RATE = 4
+    # similarity detection is skipped above this many candidate pairs
+    MAX_PAIRS = 250000
+
+    def __init__(self, obj_blob, objects_path, repo_path, copies=False, similarity=None):
+        self.obj_blob = obj_blob
+        self.objects_path = objects_path
+        self.repo_path = repo_path
+        self.copies = copies
+        self.similarity = similarity
+        self.blob_index = dict()
+
+    def index(self, path, blob_hash):
+        """ Record a file of the committed tree, to find the sources of copies. """
+        self.blob_index.setdefault(blob_hash, path)
+
+    def pair(self, deleted, added):
+        """ Generate changes for the deleted and added files, pairing what can be paired. """
+        deleted_by_hash = dict()
+        for change in deleted:
+            deleted_by_hash.setdefault(change.old_hash, list()).append(change)
+
+        unpaired = list()
+        for change in added:
+            sources = deleted_by_hash.get(change.new_hash)
+            if sources:
+                source = sources.pop(0)
+                yield Change(change.path, RENAMED, source.old_hash, change.new_hash, source.path)
+            elif self.copies and change.new_hash in self.blob_index:
+                yield Change(change.path, COPIED, change.new_hash, change.new_hash,
+                             self.blob_index[change.new_hash])
+            else:
+                unpaired.append(change)
+
+        remaining = [change for sources in deleted_by_hash.values() for change in sources]
+        if self.similarity is not None:
+            yield from self._pair_similar(remaining, unpaired)
+        else:
+            yield from remaining
+            yield from unpaired
+
+    def _pair_similar(self, deleted, added):
+        """ Pair the most similar deleted and added files above the similarity threshold. """
+        if not deleted or not added or len(deleted) * len(added) > self.MAX_PAIRS:
+            if deleted and added:
+                log.warning("Too many files for similarity based rename detection, skipping it.")
+            yield from deleted
+            yield from added
+            return
+
+        deleted_prints = [self._fingerprint_blob(change.old_hash) for change in deleted]
+        added_prints = [self._fingerprint_file(change.path) for change in added]
+
+        scores = list()
+        for i, deleted_print in enumerate(deleted_prints):
+            for j, added_print in enumerate(added_prints):
+                score = self._similarity(deleted_print, added_print)
+                if score >= self.similarity:
+                    scores.append((score, i, j))
+
+        paired_deleted, paired_added = set(), set()
+        for score, i, j in sorted(scores, reverse=True):
+            if i in paired_deleted or j in paired_added:
+                continue
+            paired_deleted.add(i)
+            paired_added.add(j)
+            yield Change(added[j].path, RENAMED, deleted[i].old_hash, added[j].new_hash, deleted[i].path)
+
+        for i, change in enumerate(deleted):
+            if i not in paired_deleted:
+                yield change
+        for j, change in enumerate(added):
+            if j not in paired_added:
+                yield change
+
+    def _fingerprint_blob(self, blob_hash):
+        with self.obj_blob.open_content(os.path.join(self.objects_path, blob_hash)) as f_in:
+            return self._fingerprint(f_in.read(self.FINGERPRINT_MAX_SIZE))
+
+    def _fingerprint_file(self, path):
+        with open(os.path.join(self.repo_path, path), 'rb') as f_in:
+            return self._fingerprint(f_in.read(self.FINGERPRINT_MAX_SIZE))
+
+    def _fingerprint(self, content):
+        """
+        Set of line hashes, sampled by hash value for longer files. Returns
+        whether it is sampled along with it.
+        """
+        line_hashes = set(zlib.crc32(line) for line in content.splitlines())
+        if len(line_hashes) > self.SAMPLE_MIN_LINES:
+            return True, self._sample(line_hashes)
+        return False, line_hashes
+
+    def _sample(self, line_hashes):
+        return set(line_hash for line_hash in line_hashes if not line_hash % self.SAMPLE_RATE)
+
+    def _similarity(self, fingerprint1, fingerprint2):
+        """ Jaccard similarity of two fingerprints, sampled the same way. """
+        sampled1, line_hashes1 = fingerprint1
+        sampled2, line_hashes2 = fingerprint2
+        if sampled1 and not sampled2:
+            line_hashes2 = self._sample(line_hashes2)
+        elif sampled2 and not sampled1:
+            line_hashes1 = self._sample(line_hashes1)
+
+        if not line_hashes1 and not line_hashes2:
+            return 0.0
+        return len(line_hashes1 & line_hashes2) / len(line_hashes1 | line_hashes2)
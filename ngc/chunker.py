@@ -0,0 +1,120 @@
+import hashlib
+import logging
+
+log = logging.getLogger(__name__)
+
+def _byte_table():
+    """ Pseudo random but fixed byte for every byte value. """
+    return bytes(hashlib.sha1(bytes([i])).digest()[0] for i in range(256))
+
+def _bit_table():
+    """ Pseudo random but fixed bit, as a byte 0 or 1, for every byte value. """
+    return bytes(hashlib.sha1(bytes([i])).digest()[1] & 1 for i in range(256))
+
+class Chunker:
+    """
+    Content-defined chunker. Every byte, together with the CONTEXT bytes
+    before it, is mapped to a pseudo random bit and a chunk is cut after the
+    first run of enough set bits, so that cuts only depend on the few bytes
+    before them and an edit only changes the chunks around it. Taking the
+    preceding bytes in keeps the bits balanced for skewed data like text.
+    Mapping the bytes (bytes.translate and XOR of big integers) and
+    searching for a run (bytes.find) all run in C, which keeps the chunker
+    ahead of hashing and compression, unlike a rolling hash computed byte
+    by byte in Python.
+    Normalized chunking, as in FastCDC, asks for a longer run before the
+    average chunk size and a shorter one after it, keeping chunk sizes
+    close to the average.
+    """
+
+    MIN_SIZE = 256 * 1024
+    AVG_SIZE = 1024 * 1024
+    MAX_SIZE = 4 * 1024 * 1024
+
+    # bytes mapped into each bit, as bit shifts of the whole data which
+    # don't fall on byte boundaries so that neighbouring bytes don't commute
+    SHIFTS = (9, 18)
+    CONTEXT = 3
+    SCAN_STEP = 256 * 1024
+    BYTES = _byte_table()
+    BITS = _bit_table()
+
+    def __init__(self, min_size=None, avg_size=None, max_size=None):
+        self.min_size = min_size or self.MIN_SIZE
+        self.avg_size = avg_size or self.AVG_SIZE
+        self.max_size = max_size or self.MAX_SIZE
+        # a run of n set bits first shows up after about 2 ** (n + 1) bytes,
+        # runs are two bits longer and shorter than the average size asks for,
+        # less one for the min_size bytes skipped
+        avg_bits = self.avg_size.bit_length() - 1
+        self.run_small = b'\x01' * (avg_bits + 1)
+        self.run_large = b'\x01' * (avg_bits - 3)
+
+    def bits(self, buf, start, end):
+        """
+        Map the bytes from start to end of the buffer to pseudo random bits,
+        as bytes 0 or 1, each depending on the byte and the CONTEXT before.
+        """
+        context = min(self.CONTEXT, start)
+        data = buf[start - context:end]
+
+        # big endian, so shifting right moves each byte onto the next ones
+        mapped = int.from_bytes(data.translate(self.BYTES), 'big')
+        mixed = mapped
+        for shift in self.SHIFTS:
+            mixed ^= mapped >> shift
+        return mixed.to_bytes(len(data), 'big')[context:].translate(self.BITS)
+
+    def chunks(self, f_in):
+        """ Generate the chunks of a binary file object, reading it as a stream. """
+        buf = b''
+        start = 0
+        eof = False
+
+        while True:
+            if not eof and len(buf) - start < self.max_size:
+                data = f_in.read(self.max_size)
+                if data:
+                    # the buffer is only copied when refilled, not for every chunk
+                    buf = buf[start:] + data
+                    start = 0
+                    continue
+                eof = True
+            if start >= len(buf):
+                break
+
+            cut = self.find_cut(buf, start)
+            yield buf[start:cut]
+            start = cut
+
+    def find_cut(self, buf, start=0):
+        """ Get the end offset of the chunk starting at offset start of the buffer. """
+        size = len(buf) - start
+        if size <= self.min_size:
+            return len(buf)
+        end = start + min(size, self.max_size)
+        normal_end = start + min(self.avg_size, size)
+
+        # a chunk ends with a run, which must end after the first min_size
+        # bytes and is looked for with the stricter run up to normal_end
+        lo = max(start, start + self.min_size + 1 - len(self.run_small))
+        cut = self._find_run(buf, self.run_small, lo, normal_end)
+        if cut is None:
+            lo = max(lo, normal_end + 1 - len(self.run_large))
+            cut = self._find_run(buf, self.run_large, lo, end)
+
+        return end if cut is None else cut
+
+    def _find_run(self, buf, run, lo, hi):
+        """
+        Find the end of the first run lying within offsets lo to hi of the
+        buffer, or None. Bits are mapped SCAN_STEP bytes at a time, as runs
+        usually show up long before hi.
+        """
+        for step_lo in range(lo, hi, self.SCAN_STEP):
+            # steps overlap by the length of a run, less one
+            step_hi = min(hi, step_lo + self.SCAN_STEP + len(run) - 1)
+            found = self.bits(buf, step_lo, step_hi).find(run)
+            if found >= 0:
+                return step_lo + found + len(run)
+        return None
@@ -1,10 +1,24 @@
 import json
 import logging
 import os
+import shutil
+import sys
+import tarfile
+import tempfile
 import time
+import zipfile
 from pathlib import Path
 
 from . import objects
+from .blame import Blame
+from .changes import ADDED, COPIED, DELETED, MODIFIED, RENAMED, Change, RenameDetector
+from .config import Config, RepoFormat
+from .diff import Diff
+from .fastimport import FastImport
+from .fsck import Fsck
+from .lock import LockFile
+from .sparse import Sparse
+from .transfer import Transfer
 
 log = logging.getLogger(__name__)
 
@@ -16,19 +30,26 @@ class Command:
     USER_NAME = 'user_name'
     USER_EMAIL = 'user_email'
 
+    ARCHIVE_FORMATS = ('tar', 'tar.gz', 'zip')
+
     def __init__(self, repo_path=None):
         if not repo_path: repo_path=os.getcwd()
         self.repo_path = repo_path
         self.user_details = self._get_user_details()
         self.author_details = self._get_author_details()
         self.head = self._get_current_commit_hash()
-        self.obj_blob = objects.Blob()
-        self.obj_tree = objects.Tree(self.repo_path)
-        self.obj_commit = objects.Commit(self.repo_path)
+        self._load_objects()
+        self.sparse = Sparse(self.repo_path)
+
+    def refresh_head(self):
+        """ Read HEAD again, as other commands may have moved it since. """
+        self.head = self._get_current_commit_hash()
+        return self.head
 
-    def init(self):
+    def init(self, hash_name=None):
         """
         Create required subdirectories to help maintain repository status and history.
+        The hash function objects are named with is chosen here, once for all.
         """
 
         # check if user has been configured
@@ -36,84 +57,177 @@ class Command:
             print("Please configure user settings through config command first!")
             return
 
+        if hash_name is not None:
+            try:
+                RepoFormat.validate_hash(hash_name)
+            except ValueError as err:
+                print(err)
+                return
+
         self.author_details = self.user_details
         self._set_author_details()
         ngc_path = os.path.join(self.repo_path, ".ngc")
         objects_path = os.path.join(ngc_path, "objects")
+        # repositories from before the format file hold objects or a HEAD
+        # but no format, they keep the original one
+        existing = self.repo_format.exists() or self.head is not None or \
+            (os.path.isdir(objects_path) and bool(os.listdir(objects_path)))
+        if existing:
+            if hash_name is not None and hash_name != self.repo_format.get(RepoFormat.HASH):
+                print("The hash function of an existing repository can't be changed.")
+            return
 
         if not os.path.exists(ngc_path): os.makedirs(ngc_path)
         if not os.path.exists(objects_path): os.makedirs(objects_path)
 
-    def status(self):
+        try:
+            self.repo_format.create(hash_name)
+        except ValueError as err:
+            print(err)
+            return
+        self._load_objects()
+
+    def status(self, porcelain=False, detect_renames=False, detect_copies=False, similarity=None):
         """
         Display the status of the repository in regards of file changes.
+        With porcelain set, every change is printed as a JSON line instead,
+        as soon as it is found unless renames are detected, see iter_status.
         """
         if not os.path.exists(self.obj_tree.objects_path):
             print("Not a git repository! Please initialise the repository through 'ngc init' command!")
             return
 
-        modified_files = list()
-        def print_mod(file_path, blob_path):
-            file_name = file_path.split("/")[-1]
-            print(f"modified:    {file_name}")
-        def print_del(file_path, blob_path):
-            file_name = file_path.split("/")[-1]
-            print(f"deleted:    {file_name}")
-        def print_add(file_path):
-            file_name = file_path.split("/")[-1]
-            print(f"added:    {file_name}")
-
+        changes = self.iter_status(detect_renames=detect_renames, detect_copies=detect_copies,
+                                   similarity=similarity)
+        if porcelain:
+            for change in changes:
+                print(json.dumps(change._asdict()), flush=True)
+            return
 
         if self.head is not None:
             print(f"Last commit: {self.head}")
         print("Changes not committed:")
-        if self.head is not None:
-            self._check_modified_files(mod_list=modified_files, mod_func=print_mod, del_func=print_del)
-        self._check_added_files(mod_list=modified_files, add_func=print_add)
+        for change in changes:
+            print(f"{change.kind}:    {self._format_path(change)}")
         print('Use "ngc commit" to add changes to a new commit')
 
-    def diff(self):
-        pass
-
-    def commit(self, message):
+    def iter_status(self, detect_renames=False, detect_copies=False, similarity=None):
         """
-        Commit changes of a repository.
-        Note: Staging and unstaging not supported right now
+        Generate Change records of the working tree against the last commit.
+        Records are yielded as soon as they are known, so callers can consume
+        them while the walk is still in progress. Renames are only detected
+        on request, or along with copies or a similarity, because added and
+        deleted files are then held back until the end of the walk to be
+        paired up; copies are detected from files of the last commit and
+        similarity, between 0 and 1, enables detection of modified renames.
         """
-        # generate the tree for the repository and convert files
-        # to blobs
-        prev_tree_hash = self.obj_tree.current_tree_hash
-        tree_hash = self.obj_tree.create()
+        tree_hash = None
+        if self.head is not None:
+            tree_hash = self.obj_commit.get_tree_hash(self.head)
 
-        # if there are no changes, return
-        if prev_tree_hash == self.obj_tree.current_tree_hash:
-            print("No changes detected, nothing to commit.")
+        if not (detect_renames or detect_copies or similarity is not None):
+            yield from self._walk_changes(tree_hash, self.repo_path)
             return
 
-        # get previous commit's hash if it exists
-        parent_hash = self._get_current_commit_hash()
+        detector = RenameDetector(self.obj_blob, self.obj_tree.objects_path, self.repo_path,
+                                  copies=detect_copies, similarity=similarity)
+        deleted, added = list(), list()
+        for change in self._walk_changes(tree_hash, self.repo_path, detector=detector):
+            if change.kind == DELETED:
+                deleted.append(change)
+            elif change.kind == ADDED:
+                added.append(change)
+            else:
+                yield change
+
+        yield from detector.pair(deleted, added)
+
+    def diff(self, detect_renames=False, detect_copies=False, similarity=None):
+        """
+        Display the changes of the repository, with the line differences of
+        modified files.
+        """
+        if not os.path.exists(self.obj_tree.objects_path):
+            print("Not a git repository! Please initialise the repository through 'ngc init' command!")
+            return
 
-        # generate the commit object
-        commit_hash = self.obj_commit.create(tree_hash, self.author_details,
-                                             self.user_details, message, parent_hash)
+        for change in self.iter_status(detect_renames=detect_renames, detect_copies=detect_copies,
+                                       similarity=similarity):
+            print(f"{change.kind}:    {self._format_path(change)}")
+            if change.kind not in (MODIFIED, RENAMED) or change.old_hash == change.new_hash:
+                continue
+
+            blob_path = os.path.join(self.obj_tree.objects_path, change.old_hash)
+            if (self.obj_blob.get_size(blob_path) > Diff.MAX_SIZE
+                    or os.path.getsize(os.path.join(self.repo_path, change.path)) > Diff.MAX_SIZE):
+                print("Files too large to diff")
+                continue
+            with tempfile.TemporaryDirectory() as temp_dir:
+                old_file_path = os.path.join(temp_dir, "old")
+                self.obj_blob.extract_content(blob_path, old_file_path)
+                try:
+                    Diff().run(old_file_path, os.path.join(self.repo_path, change.path))
+                except UnicodeDecodeError:
+                    print("Binary files differ")
+
+    def commit(self, message):
+        """
+        Commit changes of a repository, returning the hash of the new commit.
+        Note: Staging and unstaging not supported right now
+        """
+        self.head = self._get_current_commit_hash()
 
-        self._update_commit_hash(commit_hash)
+        # generate the tree for the repository and convert files
+        # to blobs, objects are written atomically so no lock is needed
+        if self.sparse.enabled and self.head is not None:
+            # paths outside of the sparse checkout are kept as in last commit
+            base_hash = self.obj_commit.get_tree_hash(self.head)
+            tree_hash = self.obj_tree.create(sparse=self.sparse, base_hash=base_hash)
+        else:
+            tree_hash = self.obj_tree.create()
+
+        # HEAD is locked from reading the parent until it points to the new
+        # commit, so that concurrent commits can't drop one another
+        with LockFile(os.path.join(self.repo_path, ".ngc/HEAD")) as head_lock:
+            # get previous commit's hash if it exists
+            parent_hash = self._get_current_commit_hash()
+
+            # if there are no changes, return
+            if parent_hash is not None and tree_hash == self.obj_commit.get_tree_hash(parent_hash):
+                print("No changes detected, nothing to commit.")
+                self.head = parent_hash
+                return None
+
+            # generate the commit object
+            commit_hash = self.obj_commit.create(tree_hash, self.author_details,
+                                                 self.user_details, message, parent_hash)
+
+            head_lock.write(commit_hash)
+            head_lock.commit()
+
+        self.head = commit_hash
+        log.debug("Updated HEAD to %s" % (self.head))
+        return commit_hash
 
     def reset(self):
         if self.head is None:
             print("No commits detected. Can't reset.")
             return
 
-        modified_files = list()
-        def restore_file(file_path, blob_path):
-            self.obj_blob.extract_content(dst=file_path, file_path=blob_path)
-        def delete_file(file_path):
-            os.remove(file_path)
-
-        self._check_modified_files(mod_list=modified_files, mod_func=restore_file, del_func=restore_file)
-        self._check_added_files(mod_list=modified_files, add_func=delete_file)
+        for change in list(self.iter_status(detect_renames=False)):
+            file_path = os.path.join(self.repo_path, change.path)
+            if change.kind == ADDED:
+                os.remove(file_path)
+            else:
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                blob_path = os.path.join(self.obj_tree.objects_path, change.old_hash)
+                self.obj_blob.extract_content(blob_path, file_path)
 
-    def log(self, commit_hash=None):
+    def log(self, commit_hash=None, paths=None):
+        """
+        Print the history from commit_hash, HEAD by default. With paths
+        given, only commits which changed one of them are printed.
+        """
         if self.head is None:
             print("No commits added. No logs to show.")
             return
@@ -135,12 +249,34 @@ class Command:
                     commit_data = json.load(commit_file)
                 current_hash = commit_data[self.obj_commit.PARENT]
 
+        paths = [self._repo_rel_path(path) for path in paths or []]
+        resolved = None
+
         while True:
-            self.obj_commit.print_commit_file(current_hash)
             with open(os.path.join(self.repo_path, f'.ngc/objects/{current_hash}'), 'rb') as commit_file:
                 commit_data = json.load(commit_file)
-            if self.obj_commit.PARENT not in commit_data: break
-            else: current_hash = commit_data[self.obj_commit.PARENT]
+            parent_hash = commit_data.get(self.obj_commit.PARENT)
+
+            touched = True
+            if paths:
+                # compare the objects at the paths with those of the parent,
+                # which become the ones of the next commit down the history
+                if resolved is None:
+                    resolved = self._resolve_paths(commit_data[self.obj_commit.TREE], paths)
+                parent_resolved = [(None, None)] * len(paths)
+                if parent_hash is not None:
+                    parent_tree_hash = self.obj_commit.get_tree_hash(parent_hash)
+                    if parent_tree_hash == commit_data[self.obj_commit.TREE]:
+                        parent_resolved = resolved
+                    else:
+                        parent_resolved = self._resolve_paths(parent_tree_hash, paths)
+                touched = resolved != parent_resolved
+                resolved = parent_resolved
+
+            if touched:
+                self.obj_commit.print_commit_file(current_hash)
+            if parent_hash is None: break
+            else: current_hash = parent_hash
 
 
     def checkout(self, commit_hash=None):
@@ -160,6 +296,236 @@ class Command:
         tree_hash = self.obj_commit.get_tree_hash(commit_hash)
         self._restore_files(tree_hash, self.repo_path)
 
+    def blame(self, rel_path, commit_hash=None):
+        """
+        Print every line of a file along with the commit which introduced it,
+        as of commit_hash, HEAD by default.
+        """
+        if commit_hash is None: commit_hash = self.head
+        if commit_hash is None:
+            print("No commits detected. Nothing to blame.")
+            return
+
+        rel_path = self._repo_rel_path(rel_path)
+        blamed_lines = Blame(self.repo_path).run(commit_hash, rel_path)
+        if blamed_lines is None:
+            print(f"No such file in commit {commit_hash}: {rel_path}")
+            return
+
+        authors = dict()
+        width = len(str(len(blamed_lines)))
+        for line_no, (origin, line) in enumerate(blamed_lines, 1):
+            if origin not in authors:
+                author = self.obj_commit.get_commit_dict_from_file(origin)[self.obj_commit.AUTHOR]
+                authors[origin] = author.get(self.USER_NAME) or ''
+            text = line.decode('utf-8', errors='replace').rstrip("\r\n")
+            print(f"{origin[:8]} ({authors[origin]} {line_no:>{width}}) {text}")
+
+    def show(self, commit_hash, rel_path, out=None):
+        """
+        Write the content of a file as of a commit to the binary file object
+        out, stdout by default, or list the entries of a directory, see
+        write_path. Returns True if the path was found.
+        """
+        if commit_hash is None: commit_hash = self.head
+        if commit_hash is None:
+            print("No commits detected. Nothing to show.")
+            return False
+
+        try:
+            self.write_path(commit_hash, rel_path, out)
+        except FileNotFoundError as err:
+            print(err)
+            return False
+        return True
+
+    def write_path(self, commit_hash, rel_path, out=None):
+        """
+        Write the content of a file as of a commit to the binary file object
+        out, stdout by default, or the entries of a directory. Only the
+        trees along the path are read and the blob is streamed, so the cost
+        doesn't depend on the size of the repository.
+        Raises FileNotFoundError if the path isn't in the commit.
+        """
+        if out is None: out = sys.stdout.buffer
+
+        rel_path = self._repo_rel_path(rel_path)
+        kind, obj_hash = self.obj_tree.resolve_path(self.obj_commit.get_tree_hash(commit_hash), rel_path)
+        if kind is None:
+            raise FileNotFoundError(f"No such path in commit {commit_hash}: {rel_path}")
+
+        if kind == objects.TREE:
+            tree_dict = self.obj_tree.get_tree_dict(obj_hash)
+            names = sorted(list(tree_dict[self.obj_tree.FILES]) +
+                           [subdir + "/" for subdir in tree_dict[self.obj_tree.SUBDIRS]])
+            out.write("".join(name + "\n" for name in names).encode())
+        else:
+            with self.obj_blob.open_content(os.path.join(self.obj_tree.objects_path, obj_hash)) as f_in:
+                shutil.copyfileobj(f_in, out, self.obj_blob.BUF_SIZE)
+        out.flush()
+
+    def archive(self, commit_hash=None, out=None, archive_format='tar'):
+        """
+        Write the files of a commit as a tar, gzipped tar or zip archive to
+        the binary file object out, stdout by default. Blobs are streamed
+        from the object store straight into the archive without touching
+        the working tree, in memory independent of the repository size.
+        """
+        if commit_hash is None: commit_hash = self.head
+        if commit_hash is None:
+            print("No commits detected. Can't archive.")
+            return
+        if archive_format not in self.ARCHIVE_FORMATS:
+            print(f"Unknown archive format: {archive_format}")
+            return
+        if out is None: out = sys.stdout.buffer
+
+        tree_hash = self.obj_commit.get_tree_hash(commit_hash)
+        if archive_format == 'zip':
+            self._archive_zip(tree_hash, out)
+        else:
+            self._archive_tar(tree_hash, out, compressed=archive_format == 'tar.gz')
+        out.flush()
+
+    def clone(self, src_path):
+        """
+        Clone the repository at src_path into this directory and check out
+        its last commit. Objects are hardlinked from the source where possible.
+        The directory must be new or empty, as checkout replaces its files.
+        """
+        if os.path.exists(os.path.join(self.repo_path, ".ngc")):
+            print("Already an ngc repository! Use 'ngc fetch' to get new commits.")
+            return
+        if os.path.isdir(self.repo_path) and os.listdir(self.repo_path):
+            print(f"Destination isn't empty: {self.repo_path}")
+            return
+
+        src_cmd = Command(src_path)
+        if not os.path.exists(src_cmd.obj_tree.objects_path):
+            print(f"Not an ngc repository: {src_path}")
+            return
+
+        os.makedirs(self.obj_tree.objects_path)
+        # keep the format and settings of the source repository
+        if src_cmd.repo_format.exists():
+            shutil.copyfile(src_cmd.repo_format.format_path, self.repo_format.format_path)
+        if os.path.exists(src_cmd.config.config_path):
+            shutil.copyfile(src_cmd.config.config_path, self.config.config_path)
+        self._load_objects()
+
+        if self.user_details.get(self.USER_NAME):
+            self.author_details = self.user_details
+            self._set_author_details()
+
+        if src_cmd.head is None:
+            return
+
+        linked, copied = Transfer(src_path, self.repo_path).transfer(src_cmd.head)
+        print(f"Cloned {linked + copied} objects ({linked} hardlinked, {copied} copied).")
+        self._update_commit_hash(src_cmd.head)
+        self.checkout()
+
+    def fetch(self, src_path):
+        """
+        Get the objects of the last commit of the repository at src_path,
+        along with its history. The commit is recorded in .ngc/FETCH_HEAD.
+        """
+        if not os.path.exists(self.obj_tree.objects_path):
+            print("Not a git repository! Please initialise the repository through 'ngc init' command!")
+            return
+
+        src_cmd = Command(src_path)
+        if src_cmd.head is None:
+            print(f"No commits to fetch from {src_path}")
+            return
+        if src_cmd.obj_commit.hash_name != self.obj_commit.hash_name:
+            print(f"Can't fetch from a repository using {src_cmd.obj_commit.hash_name} "
+                  f"instead of {self.obj_commit.hash_name} as hash function.")
+            return
+
+        linked, copied = Transfer(src_path, self.repo_path).transfer(src_cmd.head)
+        with open(os.path.join(self.repo_path, ".ngc/FETCH_HEAD"), "w") as fetch_head_file:
+            fetch_head_file.write(src_cmd.head)
+
+        print(f"Fetched {linked + copied} objects ({linked} hardlinked, {copied} copied).")
+        print(f'Use "ngc checkout {src_cmd.head}" to check out the fetched commit.')
+
+    def fast_import(self, stream=None):
+        """
+        Import a stream of commits, stdin by default, on top of HEAD without
+        going through the working tree, see FastImport for the format.
+        HEAD stays locked for the whole import and only moves if all of it
+        succeeded. Returns the hashes of the imported commits.
+        """
+        if not os.path.exists(os.path.join(self.repo_path, ".ngc")):
+            print("Not a git repository! Please initialise the repository through 'ngc init' command!")
+            return []
+        if stream is None: stream = sys.stdin.buffer
+
+        start = time.perf_counter()
+        importer = FastImport(self.repo_path)
+        with LockFile(os.path.join(self.repo_path, ".ngc/HEAD")) as head_lock:
+            parent_hash = self._get_current_commit_hash()
+            try:
+                commit_hashes = importer.run(stream, parent_hash, self.author_details, self.user_details)
+            except ValueError as err:
+                print(f"Error: {err}")
+                return []
+
+            if commit_hashes:
+                head_lock.write(commit_hashes[-1])
+                head_lock.commit()
+                self.head = commit_hashes[-1]
+
+        print(f"Imported {len(commit_hashes)} commits ({importer.files_imported} files) "
+              f"in {time.perf_counter() - start:.2f}s.")
+        if commit_hashes:
+            print('Use "ngc checkout" to update the working tree.')
+        return commit_hashes
+
+    def fsck(self, incremental=False, jobs=None):
+        """
+        Verify the integrity of the object store, returning the number of
+        problems found. An incremental check skips objects verified before.
+        """
+        if not os.path.exists(self.obj_tree.objects_path):
+            print("Not a git repository! Please initialise the repository through 'ngc init' command!")
+            return 0
+
+        return Fsck(self.repo_path).run(incremental=incremental, jobs=jobs)
+
+    def set_sparse(self, patterns):
+        """
+        Limit checkout, reset, status and commit to the paths matching the
+        given patterns. Takes effect on the next checkout.
+        """
+        self.sparse.set_patterns(patterns)
+        print('Sparse patterns updated. Use "ngc checkout" to apply them.')
+
+    def list_sparse(self):
+        """ Print the sparse checkout patterns, if any. """
+        for pattern in self.sparse.patterns:
+            print("/".join(pattern))
+
+    def disable_sparse(self):
+        """ Select the whole tree again. Takes effect on the next checkout. """
+        self.sparse.disable()
+        print('Sparse checkout disabled. Use "ngc checkout" to restore all files.')
+
+    def config_repo(self, key, value):
+        """ Change a repository setting, value is parsed as JSON if possible. """
+        try:
+            value = json.loads(value)
+        except ValueError:
+            pass
+
+        try:
+            self.config.set(key, value)
+        except KeyError:
+            print(f"Unknown setting: {key}")
+        except ValueError as err:
+            print(err)
+
     def config_user(self, user_name, user_email):
         """ Configure user details for ngc to use. """
         self.user_details[self.USER_NAME] = user_name
@@ -212,19 +578,113 @@ class Command:
             log.debug("No HEAD file found. Assuming there were no prior commits.")
         return commit_hash
 
-    def _restore_files(self, tree_hash, dir_path):
+    def _archive_tar(self, tree_hash, out, compressed=False):
+        """ Stream the files of a tree into a tar archive, without seeking out. """
+        mtime = time.time()
+
+        with tarfile.open(fileobj=out, mode='w|gz' if compressed else 'w|') as tar_file:
+            for path, blob_hash in self._iter_tree(tree_hash):
+                tar_info = tarfile.TarInfo(path)
+                tar_info.mtime = mtime
+                if blob_hash is None:
+                    tar_info.type = tarfile.DIRTYPE
+                    tar_info.mode = 0o755
+                    tar_file.addfile(tar_info)
+                    continue
+
+                blob_path = os.path.join(self.obj_tree.objects_path, blob_hash)
+                tar_info.size = self.obj_blob.get_size(blob_path)
+                tar_info.mode = 0o644
+                with self.obj_blob.open_content(blob_path) as f_in:
+                    tar_file.addfile(tar_info, f_in)
+
+    def _archive_zip(self, tree_hash, out):
+        """ Stream the files of a tree into a zip archive, which works without seeking out too. """
+        date_time = time.localtime()[:6]
+
+        with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_DEFLATED) as zip_file:
+            for path, blob_hash in self._iter_tree(tree_hash):
+                if blob_hash is None:
+                    zip_info = zipfile.ZipInfo(path + "/", date_time)
+                    zip_info.external_attr = (0o40755 << 16) | 0x10
+                    zip_file.writestr(zip_info, b'')
+                    continue
+
+                blob_path = os.path.join(self.obj_tree.objects_path, blob_hash)
+                size = self.obj_blob.get_size(blob_path)
+                zip_info = zipfile.ZipInfo(path, date_time)
+                zip_info.compress_type = zipfile.ZIP_DEFLATED
+                zip_info.external_attr = 0o644 << 16
+                zip_info.file_size = size
+                with self.obj_blob.open_content(blob_path) as f_in:
+                    with zip_file.open(zip_info, 'w', force_zip64=size >= zipfile.ZIP64_LIMIT) as f_out:
+                        shutil.copyfileobj(f_in, f_out, self.obj_blob.BUF_SIZE)
+
+    def _iter_tree(self, tree_hash):
+        """
+        Generate the repo-relative paths of a tree depth first, along with
+        their blob hash for files and None for directories.
+        """
+        stack = [('', tree_hash)]
+
+        while stack:
+            rel_path, tree_hash = stack.pop()
+            if rel_path:
+                yield rel_path[:-1], None
+
+            tree_dict = self.obj_tree.get_tree_dict(tree_hash)
+            for file, blob_hash in tree_dict[self.obj_tree.FILES].items():
+                yield rel_path + file, blob_hash
+            for subdir, subdir_hash in reversed(list(tree_dict[self.obj_tree.SUBDIRS].items())):
+                stack.append((rel_path + subdir + "/", subdir_hash))
+
+    def _resolve_paths(self, tree_hash, paths):
+        """ Get the kind and hash of the objects at the given paths of a tree. """
+        return [self.obj_tree.resolve_path(tree_hash, path) for path in paths]
+
+    def _repo_rel_path(self, path):
+        """ Turn a path given on the command line into a repo-relative one with / separators. """
+        if os.path.isabs(path):
+            path = os.path.relpath(path, self.repo_path)
+        return "/".join(part for part in path.split(os.sep) if part and part != '.')
+
+    def _format_path(self, change):
+        """ Path of a change for display, showing where renames and copies come from. """
+        if change.old_path is not None:
+            return f"{change.old_path} -> {change.path}"
+        return change.path
+
+    def _load_objects(self):
+        """ Set up the object handlers with the repository format and settings. """
+        self.repo_format = RepoFormat(self.repo_path)
+        self.config = Config(self.repo_path)
+        hash_name = self.repo_format.get(RepoFormat.HASH)
+        self.obj_blob = objects.Blob(self.config, hash_name)
+        self.obj_tree = objects.Tree(self.repo_path, self.config, hash_name)
+        self.obj_commit = objects.Commit(self.repo_path, hash_name)
+
+    def _restore_files(self, tree_hash, dir_path, rel_path=''):
+        """
+        Materialize the files of a tree object, skipping the subtrees outside
+        of the sparse checkout patterns without reading them.
+        """
         tree_dict = self.obj_tree.get_tree_dict(tree_hash)
+        os.makedirs(dir_path, exist_ok=True)
 
         for file in tree_dict[self.obj_tree.FILES]:
+            if not self.sparse.includes(rel_path + file):
+                continue
             blob_name = tree_dict[self.obj_tree.FILES][file]
             blob_path = os.path.join(self.repo_path, ".ngc/objects", blob_name)
             file_path = os.path.join(dir_path, file)
             self.obj_blob.extract_content(blob_path, file_path)
 
         for subdir in tree_dict[self.obj_tree.SUBDIRS]:
+            if not self.sparse.overlaps(rel_path + subdir):
+                continue
             subdir_path = os.path.join(dir_path, subdir)
             subdir_hash = tree_dict[self.obj_tree.SUBDIRS][subdir]
-            self._restore_files(subdir_hash, subdir_path)
+            self._restore_files(subdir_hash, subdir_path, rel_path + subdir + "/")
 
     def _update_commit_hash(self, new_commit_hash):
         """
@@ -232,64 +692,70 @@ class Command:
         """
         self.head = new_commit_hash
 
-        with open(os.path.join(self.repo_path, ".ngc/HEAD"), "w") as head_file:
-            head_file.write(new_commit_hash)
+        with LockFile(os.path.join(self.repo_path, ".ngc/HEAD")) as head_lock:
+            head_lock.write(new_commit_hash)
+            head_lock.commit()
 
         log.debug("Updated HEAD to %s" % (self.head))
 
-    def _check_modified_files(self, tree=None, path=None, mod_list=None, mod_func=None, del_func=None):
+    def _walk_changes(self, tree_hash, dir_path, rel_path='', detector=None):
         """
-        Helper function to check and list files that are modified/deleted.
+        Helper generator comparing a directory against a tree object.
+        A tree_hash of None stands for a directory missing from the commit and
+        a missing dir_path for a directory missing from the working tree.
+        Files of the tree are indexed in the rename detector, if given.
         """
-        if path is None : path = self.repo_path
-        if tree is None : tree = self.head
+        files, subdirs = dict(), dict()
+        if tree_hash is not None:
+            tree_dict = self.obj_tree.get_tree_dict(tree_hash)
+            files = tree_dict[self.obj_tree.FILES]
+            subdirs = tree_dict[self.obj_tree.SUBDIRS]
 
-        if tree is self.head:
-            with open(os.path.join(self.repo_path, ".ngc/objects", tree), "rb") as commit_file:
-                commit_data = json.load(commit_file)
-            tree = commit_data[self.obj_commit.TREE]
-        with open(os.path.join(self.repo_path, ".ngc/objects", tree), "rb") as tree_file:
-            tree_json = json.load(tree_file)
-
-
-        for file in tree_json[self.obj_tree.FILES]:
-            file_path = os.path.join(path, file)
-            blob_path = os.path.join(self.repo_path, ".ngc/objects", tree_json[self.obj_tree.FILES][file])
-            if os.path.exists(file_path):
-                file_content = open(file_path, 'rb').read()
-                blob_content = self.obj_blob.get_content(blob_path)
-                if file_content != blob_content:
-                    if type(mod_list) is list:
-                        mod_list.append(file)
-                    try:
-                        mod_func(file_path, blob_path)
-                    except TypeError:
-                        pass
-            else:
-                try:
-                    del_func(file_path, blob_path)
-                except TypeError:
-                    pass
-        for subdir in tree_json[self.obj_tree.SUBDIRS]:
-            new_path = os.path.join(path, subdir)
-            new_tree = tree_json[self.obj_tree.SUBDIRS][subdir]
-            self._check_modified_files(tree=new_tree, path=new_path, mod_list=mod_list, mod_func=mod_func, del_func=del_func)
+        if detector is not None:
+            for file, blob_hash in files.items():
+                if self.sparse.includes(rel_path + file):
+                    detector.index(rel_path + file, blob_hash)
 
-    def _check_added_files(self, mod_list=None, add_func=None):
+        try:
+            items = sorted(os.listdir(dir_path))
+        except OSError:
+            items = list()
 
-        for dirpath, dirnames, filenames in os.walk(self.repo_path):
-            if "." in dirpath:
+        present_files, present_dirs = set(), set()
+        for item in items:
+            if item.startswith("."):
                 continue
-            for file in filenames:
-                if file.startswith("."):
+            item_path = os.path.join(dir_path, item)
+            item_rel_path = rel_path + item
+
+            if os.path.isfile(item_path):
+                present_files.add(item)
+                if not self.sparse.includes(item_rel_path):
+                    continue
+                old_hash = files.get(item)
+                if old_hash is not None:
+                    blob_path = os.path.join(self.obj_tree.objects_path, old_hash)
+                    matches = self.obj_blob.compare_chunked(item_path, blob_path)
+                    if matches is not None:
+                        if not matches:
+                            yield Change(item_rel_path, MODIFIED, old_hash, None)
+                        continue
+
+                new_hash = self.obj_blob.get_file_hash(item_path)
+                if old_hash is None:
+                    yield Change(item_rel_path, ADDED, None, new_hash)
+                elif old_hash != new_hash:
+                    yield Change(item_rel_path, MODIFIED, old_hash, new_hash)
+            elif os.path.isdir(item_path):
+                present_dirs.add(item)
+                if not self.sparse.overlaps(item_rel_path):
                     continue
-                file_path = os.path.join(dirpath, file)
-                hexdigest = self.obj_blob.get_file_hash(file_path)
-                if hexdigest not in os.listdir(os.path.join(self.repo_path, '.ngc/objects')):
-                    if type(mod_list) is list:
-                        if file in mod_list:
-                            continue
-                    try:
-                        add_func(file_path)
-                    except TypeError:
-                        pass
+                yield from self._walk_changes(subdirs.get(item), item_path, item_rel_path + "/", detector)
+
+        for file in files:
+            if file not in present_files and self.sparse.includes(rel_path + file):
+                yield Change(rel_path + file, DELETED, files[file], None)
+        for subdir in subdirs:
+            if subdir not in present_dirs and self.sparse.overlaps(rel_path + subdir):
+                subdir_path = os.path.join(dir_path, subdir)
+                yield from self._walk_changes(subdirs[subdir], subdir_path, rel_path + subdir + "/", detector)
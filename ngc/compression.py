@@ -0,0 +1,166 @@
+import bz2
+import gzip
+import io
+import logging
+import lzma
+import zlib
+
+log = logging.getLogger(__name__)
+
+GZIP = 'gzip'
+ZLIB = 'zlib'
+LZMA = 'lzma'
+BZ2 = 'bz2'
+NONE = 'none'
+
+CODECS = (GZIP, ZLIB, LZMA, BZ2, NONE)
+DEFAULT_CODEC = GZIP
+
+# levels used when none is configured, gzip keeps its historical level
+DEFAULT_LEVELS = {GZIP: 9, ZLIB: 6, LZMA: 6, BZ2: 9, NONE: None}
+LEVELS = {GZIP: range(0, 10), ZLIB: range(0, 10), LZMA: range(0, 10), BZ2: range(1, 10), NONE: (None,)}
+
+GZIP_MAGIC = b'\x1f\x8b'
+TAG_END = b'\x00'
+MAX_TAG_SIZE = 8
+
+# Compressed objects carry the codec they were written with, so that objects
+# written with different settings can live in one repository. gzip objects
+# are plain gzip streams (the original ngc format, recognized by the gzip
+# magic number), other codecs start with "<CODEC><NULL_CHAR>" followed by
+# the compressed stream.
+
+def open_writer(fileobj, codec=None, level=None):
+    """ Write the codec tag to fileobj and return a compressing writer for it. """
+    if codec is None: codec = DEFAULT_CODEC
+    if level is None: level = DEFAULT_LEVELS[codec]
+
+    if codec == GZIP:
+        return gzip.GzipFile(fileobj=fileobj, mode='wb', mtime=0, compresslevel=level)
+
+    fileobj.write(codec.encode('ascii') + TAG_END)
+    if codec == ZLIB:
+        return _ZlibWriter(fileobj, level)
+    elif codec == LZMA:
+        return lzma.LZMAFile(fileobj, mode='wb', preset=level)
+    elif codec == BZ2:
+        return bz2.BZ2File(fileobj, mode='wb', compresslevel=level)
+    elif codec == NONE:
+        return _Uncompressed(fileobj)
+    raise ValueError(f"Unknown compression codec: {codec}")
+
+def open_reader(fileobj):
+    """ Read the codec tag from fileobj and return a decompressing reader for it. """
+    codec = read_codec(fileobj)
+
+    if codec == GZIP:
+        return gzip.GzipFile(fileobj=fileobj, mode='rb')
+    elif codec == ZLIB:
+        return io.BufferedReader(_ZlibReader(fileobj))
+    elif codec == LZMA:
+        return lzma.LZMAFile(fileobj, mode='rb')
+    elif codec == BZ2:
+        return bz2.BZ2File(fileobj, mode='rb')
+    elif codec == NONE:
+        return _Uncompressed(fileobj)
+    raise ValueError(f"Unknown compression codec: {codec}")
+
+def read_codec(fileobj):
+    """ Get the codec of a compressed object, leaving fileobj after its tag. """
+    start = fileobj.read(len(GZIP_MAGIC))
+    if start == GZIP_MAGIC:
+        fileobj.seek(0)
+        return GZIP
+
+    tag = start
+    while TAG_END not in tag and len(tag) < MAX_TAG_SIZE:
+        temp = fileobj.read(1)
+        if not temp:
+            break
+        tag += temp
+    if not tag.endswith(TAG_END):
+        raise ValueError("Object has no compression tag.")
+
+    return tag[:-1].decode('ascii')
+
+def compress(data, codec=None, level=None):
+    """ Compress bytes into the tagged object format. """
+    buf = io.BytesIO()
+    with open_writer(buf, codec, level) as f_out:
+        f_out.write(data)
+    return buf.getvalue()
+
+def decompress(data):
+    """ Decompress bytes of the tagged object format. """
+    with open_reader(io.BytesIO(data)) as f_in:
+        return f_in.read()
+
+
+class _Uncompressed:
+    """ Pass-through file wrapper used for the 'none' codec. """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+
+    def read(self, size=-1):
+        return self.fileobj.read(size)
+
+    def write(self, data):
+        return self.fileobj.write(data)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _ZlibWriter:
+    """ File-like writer producing a zlib stream, zlib module has none. """
+
+    def __init__(self, fileobj, level):
+        self.fileobj = fileobj
+        self.compressor = zlib.compressobj(level)
+
+    def write(self, data):
+        self.fileobj.write(self.compressor.compress(data))
+        return len(data)
+
+    def close(self):
+        if self.compressor is not None:
+            self.fileobj.write(self.compressor.flush())
+            self.compressor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _ZlibReader(io.RawIOBase):
+    """ Raw reader decompressing a zlib stream. """
+
+    def __init__(self, fileobj, buf_size=65536):
+        self.fileobj = fileobj
+        self.buf_size = buf_size
+        self.decompressor = zlib.decompressobj()
+        self.pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        while not self.pending and not self.decompressor.eof:
+            data = self.decompressor.unconsumed_tail or self.fileobj.read(self.buf_size)
+            if not data:
+                raise EOFError("Compressed object ended before the end-of-stream marker.")
+            self.pending = self.decompressor.decompress(data, len(buf))
+
+        size = min(len(buf), len(self.pending))
+        buf[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
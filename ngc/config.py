@@ -0,0 +1,126 @@
+import hashlib
+import json
+import logging
+import os
+
+from . import compression
+
+log = logging.getLogger(__name__)
+
+class Config:
+    """
+    Repository level settings, stored as JSON in .ngc/config.
+    Settings which are not stored fall back to the values in DEFAULTS.
+    """
+
+    # fnmatch patterns of repo-relative paths always stored uncompressed
+    RAW_PATTERNS = 'raw_patterns'
+    # store a blob uncompressed when its estimated compression ratio
+    # (original size / compressed size) falls below this value, 0 disables it
+    RAW_MIN_RATIO = 'raw_min_ratio'
+    # codec and level new blobs are compressed with, see compression.CODECS
+    COMPRESSION = 'compression'
+    COMPRESSION_LEVEL = 'compression_level'
+    # files above this size in bytes are stored as content-defined chunks,
+    # 0 disables chunking
+    CHUNK_THRESHOLD = 'chunk_threshold'
+
+    DEFAULTS = {
+        COMPRESSION: compression.DEFAULT_CODEC,
+        COMPRESSION_LEVEL: None,
+        CHUNK_THRESHOLD: 0,
+        RAW_PATTERNS: [],
+        RAW_MIN_RATIO: 1.1,
+    }
+
+    def __init__(self, path=None):
+        self.config_path = None
+        if path: self.config_path = os.path.join(path, '.ngc/config')
+        self.settings = self._load_settings()
+
+    def get(self, key):
+        return self.settings.get(key, self.DEFAULTS.get(key))
+
+    def set(self, key, value):
+        """ Change a setting and store it in the config file. """
+        if key not in self.DEFAULTS:
+            raise KeyError(key)
+        if key == self.COMPRESSION:
+            if value not in compression.CODECS:
+                raise ValueError(f"Unknown compression codec: {value}")
+            if self.get(self.COMPRESSION_LEVEL) not in compression.LEVELS[value]:
+                # the level of the previous codec doesn't apply to this one
+                self.settings.pop(self.COMPRESSION_LEVEL, None)
+        if key == self.COMPRESSION_LEVEL and value is not None:
+            codec = self.get(self.COMPRESSION)
+            if value not in compression.LEVELS[codec]:
+                raise ValueError(f"Invalid level for {codec}: {value}")
+        if key == self.RAW_PATTERNS:
+            # a single pattern would otherwise be matched character by character
+            if isinstance(value, str): value = [value]
+            if not isinstance(value, list) or not all(isinstance(pattern, str) for pattern in value):
+                raise ValueError(f"{key} must be a list of patterns: {value}")
+        if key in (self.RAW_MIN_RATIO, self.CHUNK_THRESHOLD):
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+                raise ValueError(f"{key} must be a non-negative number: {value}")
+        self.settings[key] = value
+
+        with open(self.config_path, 'w') as config_file:
+            json.dump(self.settings, config_file)
+
+    def _load_settings(self):
+        settings = dict()
+        if self.config_path and os.path.exists(self.config_path):
+            with open(self.config_path, 'r') as config_file:
+                settings = json.load(config_file)
+        return settings
+
+
+class RepoFormat:
+    """
+    Format of a repository, chosen at init and stored as JSON in .ngc/format.
+    Unlike the settings of the config it can't change once objects have
+    been written, as object names depend on it. Repositories without the
+    file use the original format.
+    """
+
+    # hash function objects are named with
+    HASH = 'hash'
+    HASH_FUNCTIONS = ('sha1', 'sha256', 'sha512', 'blake2b', 'blake2s', 'sha3_256')
+
+    DEFAULTS = {
+        HASH: 'sha1',
+    }
+
+    def __init__(self, path=None):
+        self.format_path = None
+        if path: self.format_path = os.path.join(path, '.ngc/format')
+        self.settings = self._load_settings()
+
+    def exists(self):
+        return bool(self.format_path) and os.path.exists(self.format_path)
+
+    def get(self, key):
+        return self.settings.get(key, self.DEFAULTS.get(key))
+
+    @classmethod
+    def validate_hash(cls, hash_name):
+        """ Raise ValueError unless objects can be named with the hash function. """
+        if hash_name not in cls.HASH_FUNCTIONS or hash_name not in hashlib.algorithms_available:
+            raise ValueError(f"Unsupported hash function: {hash_name}")
+
+    def create(self, hash_name=None):
+        """ Store the format of a new repository. """
+        if hash_name is None: hash_name = self.DEFAULTS[self.HASH]
+        self.validate_hash(hash_name)
+        self.settings = {self.HASH: hash_name}
+
+        with open(self.format_path, 'w') as format_file:
+            json.dump(self.settings, format_file)
+
+    def _load_settings(self):
+        settings = dict()
+        if self.exists():
+            with open(self.format_path, 'r') as format_file:
+                settings = json.load(format_file)
+        return settings
@@ -1,22 +1,91 @@
+import logging
+from collections import namedtuple
+
+log = logging.getLogger(__name__)
+
+# range of lines [start, end) in each file which differ
+rng = namedtuple('rng', ['file_1_start', 'file_1_end', 'file_2_start', 'file_2_end'])
+
 class Diff:
 
+    # files larger than this, in bytes, aren't diffed line by line
+    MAX_SIZE = 1024 * 1024
+    # LCS table cells allowed for the changed middle part of a diff, above
+    # which the whole middle part is shown as replaced
+    MAX_TABLE = 4 * 1024 * 1024
+
     def __init__(self):
         pass
 
     def run(self,file1,file2):
-        file1_lines = open(file1, 'r').readlines()
-        file2_lines = open(file2, 'r').readlines()
-
-        lcs_table = self.generate_lcs_table(file1_lines, file2_lines)
-
-        rngs = list()
+        with open(file1, 'r') as f1, open(file2, 'r') as f2:
+            file1_lines = f1.readlines()
+            file2_lines = f2.readlines()
 
-        self.generate_ranges(lcs_table,file1_lines, file2_lines, len(file1_lines)-1, len(file2_lines)-1, rngs)
-        rngs = rngs[::-1]
-        self.merge_ranges(rngs)
+        runs = self.match_lines(file1_lines, file2_lines, max_table=self.MAX_TABLE)
+        rngs = self.ranges_from_runs(runs, len(file1_lines), len(file2_lines))
 
         self.print_diff(file1_lines, file2_lines, rngs)
 
+    def ranges_from_runs(self, runs, file1_len, file2_len):
+        """ Get the ranges of differing lines left between runs of matching lines. """
+        rngs = list()
+        i = j = 0
+        for file_1_start, file_2_start, length in runs + [[file1_len, file2_len, 0]]:
+            if i < file_1_start or j < file_2_start:
+                rngs.append(rng(i, file_1_start, j, file_2_start))
+            i, j = file_1_start + length, file_2_start + length
+        return rngs
+
+    def match_lines(self, file1_lines, file2_lines, max_table=None):
+        """
+        Pair up the lines kept unchanged between two versions of a file.
+        Returns runs of matching lines as [file_1_start, file_2_start, length].
+        Common leading and trailing lines are matched up front so the LCS
+        table only spans the changed middle part, and it is walked back
+        iteratively so long files don't hit the recursion limit. If the
+        table would have more than max_table cells, only the common leading
+        and trailing lines are matched.
+        """
+        prefix = 0
+        while (prefix < len(file1_lines) and prefix < len(file2_lines)
+               and file1_lines[prefix] == file2_lines[prefix]):
+            prefix += 1
+        suffix = 0
+        while (suffix < len(file1_lines) - prefix and suffix < len(file2_lines) - prefix
+               and file1_lines[-1 - suffix] == file2_lines[-1 - suffix]):
+            suffix += 1
+
+        middle1 = file1_lines[prefix:len(file1_lines) - suffix]
+        middle2 = file2_lines[prefix:len(file2_lines) - suffix]
+        if max_table is not None and len(middle1) * len(middle2) > max_table:
+            log.debug("Changed part of %d x %d lines too large to match" % (len(middle1), len(middle2)))
+            middle1 = middle2 = []
+        lcs_table = self.generate_lcs_table(middle1, middle2)
+
+        pairs = list()
+        i, j = len(middle1) - 1, len(middle2) - 1
+        while i >= 0 and j >= 0:
+            if middle1[i] == middle2[j]:
+                pairs.append((prefix + i, prefix + j))
+                i, j = i - 1, j - 1
+            elif lcs_table[i][j-1] >= lcs_table[i-1][j]:
+                j -= 1
+            else:
+                i -= 1
+        pairs.reverse()
+
+        runs = list()
+        if prefix:
+            runs.append([0, 0, prefix])
+        for i, j in pairs:
+            if runs and runs[-1][0] + runs[-1][2] == i and runs[-1][1] + runs[-1][2] == j:
+                runs[-1][2] += 1
+            else:
+                runs.append([i, j, 1])
+        if suffix:
+            runs.append([len(file1_lines) - suffix, len(file2_lines) - suffix, suffix])
+        return runs
 
     def generate_lcs_table(self, file1_lines, file2_lines):
 
@@ -31,48 +100,6 @@ class Diff:
 
         return lcs_table
 
-    def generate_ranges(self,lcs_table, file1_lines, file2_lines, i, j, rngs):
-        if i<0 and j<0:
-            return
-        elif i < 0:
-            new_rng = rng(i+1,i+1,j,j+1)
-            rngs.append(new_rng)
-            print("added i<0:", new_rng)
-            self.generate_ranges(lcs_table, file1_lines, file2_lines, i, j-1, rngs)
-        elif j < 0:
-            new_rng = rng(i,i+1,j+1,j+1)
-            rngs.append(new_rng)
-            print("added j<0:", new_rng)
-            self.generate_ranges(lcs_table, file1_lines, file2_lines, i-1, j,rngs)
-        elif file1_lines[i] == file2_lines[j]:
-            self.generate_ranges(lcs_table, file1_lines, file2_lines, i-1, j-1,rngs)
-        elif lcs_table[i][j-1] >= lcs_table[i-1][j]:
-            new_rng = rng(i+1,i+1,j,j+1)
-            rngs.append(new_rng)
-            print("added >:", new_rng)
-            self.generate_ranges(lcs_table, file1_lines, file2_lines, i, j-1,rngs)
-        elif lcs_table[i][j-1] < lcs_table[i-1][j]:
-            new_rng = rng(i,i+1,j+1,j+1)
-            rngs.append(new_rng)
-            print("added <:", new_rng)
-            self.generate_ranges(lcs_table, file1_lines, file2_lines, i-1, j,rngs)
-
-    def merge_ranges(self, li):
-        i = 0
-        while True:
-            if i >= len(li)-1:
-                break
-            if li[i].file_1_end == li[i+1].file_1_start:
-                new_rng = rng(li[i].file_1_start, li[i+1].file_1_end, li[i].file_2_start, li[i+1].file_2_end)
-                del li[i:i+2]
-                li.insert(i, new_rng)
-            elif li[i].file_2_end == li[i+1].file_2_start:
-                new_rng = rng(li[i].file_1_start, li[i+1].file_1_end, li[i].file_2_start, li[i+1].file_2_end)
-                del li[i:i+2]
-                li.insert(i, new_rng)
-            else: i += 1
-        return li
-
     def print_diff(self, file1_lines, file2_lines, rngs):
         #just for individual ranges for now
         i = 0
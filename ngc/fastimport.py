@@ -0,0 +1,195 @@
+import logging
+import os
+import re
+
+from . import objects
+
+log = logging.getLogger(__name__)
+
+
+class _TreeState:
+    """
+    In-memory directory of the tree being imported. Directories are only
+    read from their tree object once something below them changes, and
+    keep their hash until then, so only changed trees get written.
+    """
+
+    def __init__(self, obj_tree, tree_hash=None):
+        self.obj_tree = obj_tree
+        # None once changed since it was read or written
+        self.tree_hash = tree_hash
+        self.files = None
+        self.subdirs = None
+
+    def set_file(self, parts, blob_hash):
+        """ Point the path given as a list of names at a blob, replacing whatever was there. """
+        self._load()
+        self.tree_hash = None
+        name = parts[0]
+
+        if len(parts) == 1:
+            self.subdirs.pop(name, None)
+            self.files[name] = blob_hash
+            return
+
+        self.files.pop(name, None)
+        if name not in self.subdirs:
+            self.subdirs[name] = _TreeState(self.obj_tree)
+        self.subdirs[name].set_file(parts[1:], blob_hash)
+
+    def delete(self, parts):
+        """ Remove a file or directory, dropping directories left empty. Returns whether it existed. """
+        self._load()
+        name = parts[0]
+
+        if len(parts) == 1:
+            deleted = self.files.pop(name, None) is not None or self.subdirs.pop(name, None) is not None
+        elif name in self.subdirs:
+            deleted = self.subdirs[name].delete(parts[1:])
+            if deleted and self.subdirs[name].is_empty():
+                del self.subdirs[name]
+        else:
+            deleted = False
+
+        if deleted:
+            self.tree_hash = None
+        return deleted
+
+    def is_empty(self):
+        self._load()
+        return not self.files and not self.subdirs
+
+    def write(self):
+        """ Write the trees changed below and including this one, returning its hash. """
+        if self.tree_hash is not None:
+            return self.tree_hash
+
+        tree_obj = dict()
+        tree_obj[self.obj_tree.FILES] = dict(self.files)
+        tree_obj[self.obj_tree.SUBDIRS] = {name: subdir.write() for name, subdir in self.subdirs.items()}
+        self.tree_hash = self.obj_tree.write_tree_dict(tree_obj)
+        return self.tree_hash
+
+    def _load(self):
+        if self.files is not None:
+            return
+
+        self.files, self.subdirs = dict(), dict()
+        if self.tree_hash is not None:
+            tree_dict = self.obj_tree.get_tree_dict(self.tree_hash)
+            self.files.update(tree_dict[self.obj_tree.FILES])
+            for name, subdir_hash in tree_dict[self.obj_tree.SUBDIRS].items():
+                self.subdirs[name] = _TreeState(self.obj_tree, subdir_hash)
+
+
+class FastImport:
+    """
+    Import of a stream of snapshots straight into the object store, with
+    no working tree involved. The stream is a sequence of commits:
+
+        commit
+        author <name> <<email>>      (optional)
+        data <length>
+        <message>
+        M <length> <path>            (a file and its content)
+        <content>
+        D <path>                     (delete a file or directory)
+        deleteall                    (start over from an empty tree)
+
+    Each commit starts from the tree of the previous one, which is kept in
+    memory, so the cost of a commit grows with what changed in it.
+    """
+
+    AUTHOR_RE = re.compile(r"^author (.*) <(.*)>$")
+
+    def __init__(self, repo_path=None):
+        if not repo_path: repo_path = os.getcwd()
+        self.repo_path = repo_path
+        self.obj_tree = objects.Tree(repo_path)
+        self.obj_commit = objects.Commit(repo_path)
+        self.obj_blob = self.obj_tree.blob
+        self.files_imported = 0
+        self._line_no = 0
+
+    def run(self, stream, parent_hash, author_details, committer_details):
+        """
+        Import the commits of a binary stream on top of parent_hash and
+        return their hashes in order. Raises ValueError for a malformed
+        stream, HEAD is left for the caller to update.
+        """
+        tree_hash = None
+        if parent_hash is not None:
+            tree_hash = self.obj_commit.get_tree_hash(parent_hash)
+        tree = _TreeState(self.obj_tree, tree_hash)
+        commit_hashes = list()
+
+        line = self._read_line(stream)
+        while line is not None:
+            if line == 'done':
+                break
+            if line != 'commit':
+                raise ValueError(f"line {self._line_no}: expected 'commit', got {line!r}")
+
+            author = dict(author_details)
+            line = self._read_line(stream)
+            match = self.AUTHOR_RE.match(line or '')
+            if match:
+                author = {'user_name': match.group(1), 'user_email': match.group(2)}
+                line = self._read_line(stream)
+            message = self._read_data(stream, line).decode()
+
+            line = self._read_line(stream)
+            while line is not None and line not in ('commit', 'done'):
+                if line == 'deleteall':
+                    tree = _TreeState(self.obj_tree)
+                elif line.startswith('D '):
+                    tree.delete(self._split_path(line[2:]))
+                elif line.startswith('M '):
+                    length, _, rel_path = line[2:].partition(' ')
+                    parts = self._split_path(rel_path)
+                    data = self._read_data(stream, "data " + length)
+                    raw = True if self.obj_blob.matches_raw_patterns("/".join(parts)) else None
+                    blob_hash = self.obj_blob.create_from_bytes(data, self.obj_tree.objects_path, raw=raw)
+                    self.files_imported += 1
+                    tree.set_file(parts, blob_hash)
+                else:
+                    raise ValueError(f"line {self._line_no}: unknown command {line!r}")
+                line = self._read_line(stream)
+
+            parent_hash = self.obj_commit.create(tree.write(), author, committer_details,
+                                                 message, parent_hash)
+            commit_hashes.append(parent_hash)
+            log.debug("Imported commit %s" % parent_hash)
+
+        return commit_hashes
+
+    def _read_line(self, stream):
+        """ Read the next non-blank line of the stream, None at its end. """
+        while True:
+            line = stream.readline()
+            if not line:
+                return None
+            self._line_no += 1
+            line = line.decode().rstrip("\n")
+            if line:
+                return line
+
+    def _read_data(self, stream, line):
+        """ Read the content announced by a 'data <length>' line. """
+        if line is None or not re.match(r"^data \d+$", line):
+            raise ValueError(f"line {self._line_no}: expected 'data <length>', got {line!r}")
+
+        length = int(line[len("data "):])
+        data = stream.read(length)
+        if len(data) != length:
+            raise ValueError(f"line {self._line_no}: stream ended within {length} bytes of data")
+        self._line_no += data.count(b"\n")
+        return data
+
+    def _split_path(self, rel_path):
+        """ Split a repo-relative path, refusing names the working tree couldn't hold. """
+        parts = rel_path.split("/")
+        for part in parts:
+            if not part or part.startswith("."):
+                raise ValueError(f"line {self._line_no}: invalid path {rel_path!r}")
+        return parts
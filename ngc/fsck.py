@@ -0,0 +1,203 @@
+import functools
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import objects
+from .objects import BLOB, COMMIT, TREE
+
+log = logging.getLogger(__name__)
+
+def _verify_object(objects_path, hash_name, name):
+    """
+    Check that an object file still matches its name. Blobs are re-hashed
+    with their header, trees and commits are parsed and hashed as stored.
+    Runs in worker processes, hence the module level function.
+    Returns the object kind, its stored size and an error message or None.
+    """
+    blob = objects.Blob(hash_name=hash_name)
+    obj_path = os.path.join(objects_path, name)
+
+    try:
+        size = os.path.getsize(obj_path)
+        if not blob.is_raw(obj_path):
+            with open(obj_path, 'rb') as obj_file:
+                start = obj_file.read(1)
+            if start == b'{':
+                return _verify_json(blob, obj_path, name, size)
+
+        hashf = blob.new_hash()
+        hashf.update(bytes(blob.get_header(obj_path), 'ascii'))
+        with blob.open_content(obj_path) as f_in:
+            while True:
+                data = f_in.read(blob.BUF_SIZE)
+                if not data:
+                    break
+                hashf.update(data)
+
+        if hashf.hexdigest() != name:
+            return BLOB, size, f"content hashes to {hashf.hexdigest()}"
+        return BLOB, size, None
+
+    except Exception as err:
+        return None, 0, f"unreadable: {err!r}"
+
+def _verify_json(blob, obj_path, name, size):
+    """ Check a tree or commit object, both are stored as plain JSON. """
+    with open(obj_path, 'rb') as obj_file:
+        data = obj_file.read()
+
+    obj_dict = json.loads(data)
+    if objects.Tree.FILES in obj_dict and objects.Tree.SUBDIRS in obj_dict:
+        kind = TREE
+    elif objects.Commit.TREE in obj_dict:
+        kind = COMMIT
+    else:
+        return None, size, "unknown JSON object"
+
+    hashf = blob.new_hash()
+    hashf.update(data)
+    if hashf.hexdigest() != name:
+        return kind, size, f"content hashes to {hashf.hexdigest()}"
+    return kind, size, None
+
+
+class Fsck:
+    """
+    Integrity check of the object store of a repository. Every object is
+    verified against its name on a process pool, then the objects reachable
+    from HEAD are checked to be present.
+    Names of verified objects are kept in .ngc/fsck-verified, so that an
+    incremental run only has to look at objects added since.
+    """
+
+    PROGRESS_INTERVAL = 1.0
+    CHUNKSIZE = 16
+
+    def __init__(self, repo_path=None):
+        if not repo_path: repo_path = os.getcwd()
+        self.repo_path = repo_path
+        self.objects_path = os.path.join(repo_path, '.ngc/objects')
+        self.verified_path = os.path.join(repo_path, '.ngc/fsck-verified')
+        self.obj_tree = objects.Tree(repo_path)
+        self.obj_commit = objects.Commit(repo_path)
+
+    def run(self, incremental=False, jobs=None):
+        """ Verify the object store, print problems found and return their count. """
+        verified_before = self._load_verified() if incremental else set()
+        names = [name for name in self._list_objects() if name not in verified_before]
+
+        verified, errors = self._verify_objects(names, jobs)
+        errors += self._check_connectivity(verified_before)
+
+        if incremental:
+            with open(self.verified_path, 'a') as verified_file:
+                for name in verified:
+                    verified_file.write(name + "\n")
+        else:
+            with open(self.verified_path, 'w') as verified_file:
+                for name in verified:
+                    verified_file.write(name + "\n")
+
+        if errors:
+            print(f"{errors} problems found.")
+        else:
+            print("No problems found.")
+        return errors
+
+    def _verify_objects(self, names, jobs):
+        """ Verify objects on a process pool, reporting progress as they finish. """
+        verified = list()
+        errors = 0
+        total_size = 0
+        start = last_report = time.perf_counter()
+
+        verify_func = functools.partial(_verify_object, self.objects_path, self.obj_tree.hash_name)
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = executor.map(verify_func, names, chunksize=self.CHUNKSIZE)
+            for count, (name, (kind, size, error)) in enumerate(zip(names, results), 1):
+                total_size += size
+                if error is None:
+                    verified.append(name)
+                else:
+                    errors += 1
+                    print(f"error: {kind or 'object'} {name}: {error}")
+
+                now = time.perf_counter()
+                if now - last_report >= self.PROGRESS_INTERVAL:
+                    last_report = now
+                    print(f"Verified {count}/{len(names)} objects, "
+                          f"{self._throughput(total_size, now - start):.1f} MB/s", flush=True)
+
+        elapsed = time.perf_counter() - start
+        print(f"Verified {len(names)} objects ({total_size} bytes) in {elapsed:.2f}s, "
+              f"{self._throughput(total_size, elapsed):.1f} MB/s")
+        return verified, errors
+
+    def _check_connectivity(self, verified_before):
+        """
+        Check that every object reachable from HEAD is present, including
+        the chunks listed by chunked blobs. Trees and commits verified by an
+        earlier run were complete then and aren't descended into again,
+        chunked blobs always are since reading their manifest is cheap.
+        """
+        try:
+            with open(os.path.join(self.repo_path, '.ngc/HEAD'), 'r') as head_file:
+                head = head_file.read()
+        except FileNotFoundError:
+            return 0
+
+        errors = 0
+        seen = set()
+        stack = [(COMMIT, head, 'HEAD')]
+        while stack:
+            kind, name, referrer = stack.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+
+            if not os.path.exists(os.path.join(self.objects_path, name)):
+                errors += 1
+                print(f"error: missing {kind} {name}, referenced by {referrer}")
+                continue
+            if name in verified_before and kind != BLOB:
+                continue
+
+            try:
+                if kind == COMMIT:
+                    commit_dict = self.obj_commit.get_commit_dict_from_file(name)
+                    stack.append((TREE, commit_dict[self.obj_commit.TREE], name))
+                    if self.obj_commit.PARENT in commit_dict:
+                        stack.append((COMMIT, commit_dict[self.obj_commit.PARENT], name))
+                elif kind == TREE:
+                    tree_dict = self.obj_tree.get_tree_dict(name)
+                    for blob_hash in tree_dict[self.obj_tree.FILES].values():
+                        stack.append((BLOB, blob_hash, name))
+                    for subdir_hash in tree_dict[self.obj_tree.SUBDIRS].values():
+                        stack.append((TREE, subdir_hash, name))
+                else:
+                    manifest = self.obj_tree.blob.get_manifest(os.path.join(self.objects_path, name))
+                    if manifest is not None:
+                        for chunk_hash, _ in manifest[self.obj_tree.blob.CHUNKS]:
+                            stack.append((BLOB, chunk_hash, name))
+            except (ValueError, KeyError) as err:
+                errors += 1
+                print(f"error: unreadable {kind} {name}, referenced by {referrer}: {err!r}")
+
+        return errors
+
+    def _list_objects(self):
+        """ Names of the objects in the store, leaving out raw blob headers. """
+        return sorted(name for name in os.listdir(self.objects_path) if "." not in name)
+
+    def _load_verified(self):
+        verified = set()
+        if os.path.exists(self.verified_path):
+            with open(self.verified_path, 'r') as verified_file:
+                verified = set(line.strip() for line in verified_file)
+        return verified
+
+    def _throughput(self, size, elapsed):
+        return size / (1024 * 1024) / max(elapsed, 1e-9)
@@ -0,0 +1,63 @@
+import logging
+import os
+import time
+
+log = logging.getLogger(__name__)
+
+class LockFile:
+    """
+    Exclusive lock for updating a file such as HEAD, following the lockfile
+    protocol of git: the new content is written to "<FILE>.lock", created
+    exclusively, which is then renamed over the file. Writers are serialized
+    by the lock while readers need none, as the rename is atomic and they
+    always see either the old or the new content.
+    """
+
+    LOCK_SUFFIX = '.lock'
+    TIMEOUT = 10.0
+    RETRY_INTERVAL = 0.01
+
+    def __init__(self, path, timeout=None):
+        self.path = path
+        self.lock_path = path + self.LOCK_SUFFIX
+        self.timeout = self.TIMEOUT if timeout is None else timeout
+        self.fd = None
+
+    def acquire(self):
+        """ Create the lock file, waiting for another writer to finish if needed. """
+        deadline = time.monotonic() + self.timeout
+
+        while True:
+            try:
+                self.fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+                return
+            except FileExistsError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Unable to lock {self.path}, another ngc process seems to be "
+                                       f"running. If not, remove {self.lock_path} and try again.")
+                time.sleep(self.RETRY_INTERVAL)
+
+    def write(self, data):
+        """ Write the new content of the file, it takes effect on commit. """
+        os.write(self.fd, data.encode())
+
+    def commit(self):
+        """ Replace the file with the new content and release the lock. """
+        os.close(self.fd)
+        self.fd = None
+        os.replace(self.lock_path, self.path)
+        log.debug("%s updated" % self.path)
+
+    def release(self):
+        """ Release the lock, leaving the file as it was if not committed. """
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+            os.remove(self.lock_path)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
@@ -1,13 +1,25 @@
-import gzip
+import fnmatch
 import hashlib
+import io
 import json
 import logging
 import os
 import shutil
+import tempfile
 import time
+import zlib
+from contextlib import contextmanager
+
+from . import compression
+from .chunker import Chunker
+from .config import Config, RepoFormat
 
 log = logging.getLogger(__name__)
 
+BLOB = 'blob'
+TREE = 'tree'
+COMMIT = 'commit'
+
 class NgcObject:
     """
     A general class for objects of ngc.
@@ -15,29 +27,96 @@ class NgcObject:
     # TODO: Have NgcObject class actually have some common functions for all other Ngc objects
 
     BUF_SIZE = 65536
+    # hashing function of repositories which don't set one in their format
     HASHING_FUNCTION = 'sha1'
 
-    def __init__(self):
-        pass
+    def __init__(self, hash_name=None):
+        self.hash_name = hash_name or self.HASHING_FUNCTION
 
-    def compress_obj(self, obj_path, dst):
-        """ Compress the given object using gzip. """
+    def compress_obj(self, obj_path, dst, codec=None, level=None):
+        """ Compress the given object, using gzip unless told otherwise. """
 
-        with open(obj_path, "rb") as f_in, gzip.GzipFile(filename=dst, mode="wb", mtime=0) as f_out:
-            shutil.copyfileobj(f_in, f_out, self.BUF_SIZE)
+        with open(obj_path, "rb") as f_in, open(dst, "wb") as dst_file:
+            with compression.open_writer(dst_file, codec, level) as f_out:
+                shutil.copyfileobj(f_in, f_out, self.BUF_SIZE)
         log.debug("%s compressed." % obj_path)
 
     def extract_obj(self, obj_path, dst):
-        """ Uncompress the given object using gzip. """
+        """ Uncompress the given object with the codec it was compressed with. """
 
-        with gzip.open(dst, "rb") as f_in, open(obj_path, "wb") as f_out:
-            shutil.copyfileobj(f_in, f_out, self.BUF_SIZE)
+        with open(dst, "rb") as dst_file, open(obj_path, "wb") as f_out:
+            with compression.open_reader(dst_file) as f_in:
+                shutil.copyfileobj(f_in, f_out, self.BUF_SIZE)
         log.debug("%s uncompressed." % obj_path)
 
+    def copy_file(self, src, dst):
+        """
+        Copy a file in kernel space through copy_file_range (which can
+        reflink) or sendfile, falling back to a plain buffered copy where
+        neither is available.
+        """
+        with open(src, 'rb') as f_in, open(dst, 'wb') as f_out:
+            self.copy_fileobj(f_in, f_out)
+
+    def copy_fileobj(self, f_in, f_out):
+        """ Copy between two binary files opened at their start, see copy_file. """
+        size = os.fstat(f_in.fileno()).st_size
+        offset = 0
+
+        for copy_func in (self._copy_file_range, self._sendfile):
+            try:
+                offset = copy_func(f_in.fileno(), f_out.fileno(), offset, size)
+            except (AttributeError, OSError) as err:
+                log.debug("%s failed: %s" % (copy_func.__name__, err))
+                offset = os.lseek(f_out.fileno(), 0, os.SEEK_CUR)
+            if offset >= size:
+                return
+
+        f_in.seek(offset)
+        f_out.seek(offset)
+        shutil.copyfileobj(f_in, f_out, self.BUF_SIZE)
+
+    @contextmanager
+    def atomic_write(self, dst):
+        """
+        Open a temporary file next to dst for writing and move it in place of
+        dst once written, so that readers never see a partially written file.
+        """
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(dst),
+                                         prefix=os.path.basename(dst) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                yield temp_file
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, dst)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def _copy_file_range(self, fd_in, fd_out, offset, size):
+        while offset < size:
+            copied = os.copy_file_range(fd_in, fd_out, size - offset)
+            if not copied:
+                break
+            offset += copied
+        return offset
+
+    def _sendfile(self, fd_in, fd_out, offset, size):
+        while offset < size:
+            sent = os.sendfile(fd_out, fd_in, offset, size - offset)
+            if not sent:
+                break
+            offset += sent
+        return offset
+
+    def new_hash(self):
+        """ Return a new hash object of the hashing function objects are named with. """
+        return hashlib.new(self.hash_name)
+
     def get_file_hash(self, file_path):
         """ Return a hash value of the contents of the given file. """
 
-        hashf = hashlib.new(self.HASHING_FUNCTION)
+        hashf = self.new_hash()
 
         with open(file_path, "rb") as f_in:
             while True:
@@ -55,13 +134,40 @@ class Blob(NgcObject):
     large object), in a compressed form.
     It has a simple format of: <HEADER><CONTENT>
     where HEADER is: "blob<SPACE><CONTENT.LENGTH><NULL_CHAR>"
+    The blob is compressed with the codec and level set in the repository
+    config. Content which doesn't compress well, or every blob when the
+    codec is 'none', is stored raw instead, with the header kept separately
+    in a "<BLOB_NAME>.header" file next to it.
+    Files above the chunk threshold are split into content-defined chunks,
+    each stored once as a blob of its own, and the blob file becomes a
+    manifest of the format: "chunked<NULL_CHAR><JSON>" listing the chunks.
     """
 
-    def __init__(self):
-        pass
+    HEADER_SUFFIX = '.header'
+    # files smaller than this are always compressed
+    RAW_MIN_SIZE = 65536
+    RAW_SAMPLE_SIZE = 262144
+
+    CHUNKED_TAG = b'chunked\x00'
+    SIZE = 'size'
+    CHUNKS = 'chunks'
+
+    def __init__(self, config=None, hash_name=None):
+        super().__init__(hash_name)
+        if config is None: config = Config()
+        self.config = config
+
+    def create(self, file_path, obj_path, raw=None):
+        """
+        Create the blob file for the specified file.
+        With raw left as None, raw storage is chosen from the compression
+        ratio of a sample of the file.
+        """
 
-    def create(self, file_path, obj_path):
-        """ Create the blob file for the specified file. """
+        if self._should_chunk(os.path.getsize(file_path)):
+            # hashed while chunked, so that the file is only read once
+            with open(file_path, 'rb') as f_in:
+                return self._create_chunked(f_in, os.path.getsize(file_path), obj_path)
 
         # get the hash value of file as name for blob file
         compressed_filename = self.get_file_hash(file_path)
@@ -70,64 +176,150 @@ class Blob(NgcObject):
         # create the header for the blob file and write it
         header = bytes(self._create_header(os.path.getsize(file_path)), 'ascii')
 
+        codec = self.config.get(Config.COMPRESSION)
+        if raw is None:
+            with open(file_path, 'rb') as f_in:
+                sample = f_in.read(self.RAW_SAMPLE_SIZE)
+            raw = codec == compression.NONE or self._compresses_poorly(sample, os.path.getsize(file_path))
+
+        if raw:
+            # the header goes first, so that the blob is never seen without it
+            with self.atomic_write(blob_path + self.HEADER_SUFFIX) as header_file:
+                header_file.write(header)
+            with open(file_path, 'rb') as f_in, self.atomic_write(blob_path) as f_out:
+                self.copy_fileobj(f_in, f_out)
+            log.debug("%s stored raw." % file_path)
+            return compressed_filename
+
         # write compressed data to the blob file with the specified format
-        with open(file_path, 'rb') as f_in:
-            with gzip.GzipFile(filename=blob_path, mode="wb", mtime=0) as f_out: # TODO: reverse file handler's name
+        level = self.config.get(Config.COMPRESSION_LEVEL)
+        with open(file_path, 'rb') as f_in, self.atomic_write(blob_path) as blob_file:
+            with compression.open_writer(blob_file, codec, level) as f_out:
                 f_out.write(header)
                 shutil.copyfileobj(f_in, f_out, self.BUF_SIZE)
 
         return compressed_filename
 
+    def create_from_bytes(self, data, obj_path, raw=None):
+        """
+        Create the blob file for in-memory content, the way create does for
+        a file, unless it exists already. Returns the hash of the blob.
+        """
+        if not self._should_chunk(len(data)):
+            return self._create_from_bytes(data, obj_path, raw)
+
+        return self._create_chunked(io.BytesIO(data), len(data), obj_path)
+
+    def is_raw(self, file_path):
+        """ Check if the blob file is stored uncompressed. """
+        return os.path.exists(file_path + self.HEADER_SUFFIX)
+
+    def matches_raw_patterns(self, rel_path):
+        """ Check if the repo-relative path is configured for raw storage. """
+        for pattern in self.config.get(Config.RAW_PATTERNS):
+            if fnmatch.fnmatch(rel_path, pattern):
+                return True
+        return False
+
+    def get_manifest(self, file_path):
+        """ Get the chunk manifest of a chunked blob file, None for other blobs. """
+        if self.is_raw(file_path):
+            return None
+
+        with open(file_path, "rb") as blob_file:
+            if blob_file.read(len(self.CHUNKED_TAG)) != self.CHUNKED_TAG:
+                return None
+            return json.load(blob_file)
+
+    def matches_manifest(self, file_path, manifest):
+        """
+        Check if a file has the content listed in a chunk manifest. The file
+        is hashed chunk by chunk, stopping at the first mismatch.
+        """
+        if os.path.getsize(file_path) != manifest[self.SIZE]:
+            return False
+
+        with open(file_path, "rb") as f_in:
+            for chunk_hash, chunk_size in manifest[self.CHUNKS]:
+                if self._get_bytes_hash(f_in.read(chunk_size)) != chunk_hash:
+                    return False
+
+        return True
+
+    def compare_chunked(self, file_path, blob_path):
+        """
+        Compare a file against a blob chunk by chunk, if the blob is chunked.
+        Returns None for blobs which aren't, otherwise whether the file matches.
+        """
+        # chunked blobs are always larger than a chunk, see _should_chunk
+        if os.path.getsize(file_path) <= Chunker.MAX_SIZE:
+            return None
+
+        manifest = self.get_manifest(blob_path)
+        if manifest is None:
+            return None
+
+        return self.matches_manifest(file_path, manifest)
+
+    def open_content(self, file_path):
+        """
+        Open a blob file for streaming its content, whichever way it is
+        stored. The returned file object has the header already skipped.
+        """
+        if self.is_raw(file_path):
+            return open(file_path, "rb")
+
+        manifest = self.get_manifest(file_path)
+        if manifest is not None:
+            return _ChunkedReader(self, os.path.dirname(file_path), manifest[self.CHUNKS])
+
+        blob_file = open(file_path, "rb")
+        f_in = _ContentReader(compression.open_reader(blob_file), blob_file)
+        self._read_header(f_in)
+        return f_in
+
     def get_header(self, file_path):
         """ Get the header contents from the blob file. """
         # TODO: header has almost no info, enrich it
 
-        temp = b''
-        header = b''
+        if self.is_raw(file_path):
+            with open(file_path + self.HEADER_SUFFIX, 'rb') as header_file:
+                return header_file.read().decode()
 
-        with gzip.open(file_path, "rb") as blob_obj:
-            while b"\x00" not in temp:
-                temp = blob_obj.read(1)
-                if not temp:
-                    break
-                header += temp
+        manifest = self.get_manifest(file_path)
+        if manifest is not None:
+            return self._create_header(manifest[self.SIZE])
+
+        with open(file_path, "rb") as blob_file, compression.open_reader(blob_file) as f_in:
+            header = self._read_header(f_in)
 
         return header.decode()
 
+    def get_size(self, file_path):
+        """ Get the content length of a blob file, as recorded in its header. """
+        return int(self.get_header(file_path)[len("blob "):-1])
+
     def get_content(self, file_path):
         """ Get contents of a blob file. """
-        temp = b""
-        header = b""
-
-        with gzip.open(file_path, "rb") as f_in:
-            while b"\x00" not in header:
-                temp = f_in.read(1)
-                if not temp:
-                    break
-                header += temp
+        with self.open_content(file_path) as f_in:
             content = f_in.read()
 
         return content
 
     def extract_content(self, file_path, dst):
         """ Extract contents of a blob file to destination file. """
-        header = b""
+        if self.is_raw(file_path):
+            self.copy_file(file_path, dst)
+            return
 
-        with gzip.open(file_path, "rb") as f_in:
-            with open(dst, "wb") as f_out:
-                while b"\x00" not in header:
-                    header = f_in.read(1)
-                while True:
-                    buf_data = f_in.read(self.BUF_SIZE)
-                    if not buf_data:
-                        break
-                    f_out.write(buf_data)
+        with self.open_content(file_path) as f_in, open(dst, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out, self.BUF_SIZE)
 
     def get_file_hash(self, file_path):
         """ Overriden file hash function to include header value as well. """
 
         compressed_filename = None
-        hashf = hashlib.new(self.HASHING_FUNCTION)
+        hashf = self.new_hash()
         header = self._create_header(os.path.getsize(file_path))
 
         hashf.update(bytes(header, 'ascii'))
@@ -143,10 +335,164 @@ class Blob(NgcObject):
         compressed_filename = hashf.hexdigest()
         return compressed_filename
 
+    def _get_bytes_hash(self, data):
+        """ Hash of in-memory content, following the same header rule. """
+        hashf = self.new_hash()
+        hashf.update(bytes(self._create_header(len(data)), 'ascii'))
+        hashf.update(data)
+        return hashf.hexdigest()
+
     def _create_header(self, content_length):
         """ Create header with the format: 'blob<SPACE><CONTENT.LENGTH><NULL_CHAR>' """
         return f"blob {content_length}\x00"
 
+    def _read_header(self, f_in):
+        """ Read the header from an uncompressed blob stream, up to the null char. """
+        temp = b""
+        header = b""
+
+        while b"\x00" not in temp:
+            temp = f_in.read(1)
+            if not temp:
+                break
+            header += temp
+
+        return header
+
+    def _should_chunk(self, size):
+        """
+        Check if a file of the given size is stored chunked. Only files larger
+        than a single chunk can be, which lets status skip looking for a
+        manifest for smaller ones.
+        """
+        threshold = self.config.get(Config.CHUNK_THRESHOLD)
+        return bool(threshold) and size > max(threshold, Chunker.MAX_SIZE)
+
+    def _create_chunked(self, f_in, size, obj_path):
+        """
+        Split the content of size bytes read from f_in into chunk blobs and
+        write the manifest listing them, unless it exists already. The blob
+        is hashed along the way, its hash is returned.
+        """
+        chunks = list()
+        hashf = self.new_hash()
+        hashf.update(bytes(self._create_header(size), 'ascii'))
+
+        for data in Chunker().chunks(f_in):
+            hashf.update(data)
+            chunk_hash = self._create_from_bytes(data, obj_path)
+            chunks.append([chunk_hash, len(data)])
+
+        compressed_filename = hashf.hexdigest()
+        blob_path = os.path.join(obj_path, compressed_filename)
+        if not os.path.exists(blob_path):
+            manifest = {self.SIZE: size, self.CHUNKS: chunks}
+            with self.atomic_write(blob_path) as blob_file:
+                blob_file.write(self.CHUNKED_TAG)
+                blob_file.write(json.dumps(manifest).encode())
+            log.debug("%s stored in %d chunks." % (blob_path, len(chunks)))
+
+        return compressed_filename
+
+    def _create_from_bytes(self, data, obj_path, raw=None):
+        """ Create the blob file for in-memory content, unless it exists already. """
+        compressed_filename = self._get_bytes_hash(data)
+        blob_path = os.path.join(obj_path, compressed_filename)
+        if os.path.exists(blob_path):
+            return compressed_filename
+
+        header = bytes(self._create_header(len(data)), 'ascii')
+        codec = self.config.get(Config.COMPRESSION)
+
+        if raw is None:
+            raw = codec == compression.NONE or self._compresses_poorly(data[:self.RAW_SAMPLE_SIZE], len(data))
+
+        if raw:
+            with self.atomic_write(blob_path + self.HEADER_SUFFIX) as header_file:
+                header_file.write(header)
+            with self.atomic_write(blob_path) as blob_file:
+                blob_file.write(data)
+            return compressed_filename
+
+        level = self.config.get(Config.COMPRESSION_LEVEL)
+        with self.atomic_write(blob_path) as blob_file:
+            with compression.open_writer(blob_file, codec, level) as f_out:
+                f_out.write(header)
+                f_out.write(data)
+
+        return compressed_filename
+
+    def _compresses_poorly(self, sample, size):
+        """ Estimate the compression ratio of content from its first bytes. """
+        min_ratio = self.config.get(Config.RAW_MIN_RATIO)
+        if not min_ratio or size < self.RAW_MIN_SIZE:
+            return False
+
+        ratio = len(sample) / len(zlib.compress(sample, 1))
+        log.debug("estimated compression ratio: %.2f" % ratio)
+
+        return ratio < min_ratio
+
+
+class _ContentReader:
+    """ Decompressing reader which also closes the blob file underneath it. """
+
+    def __init__(self, f_in, blob_file):
+        self.f_in = f_in
+        self.blob_file = blob_file
+
+    def read(self, size=-1):
+        return self.f_in.read(size)
+
+    def close(self):
+        self.f_in.close()
+        self.blob_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _ChunkedReader:
+    """ Reader streaming the content of a chunked blob, one chunk at a time. """
+
+    def __init__(self, blob, obj_path, chunks):
+        self.blob = blob
+        self.obj_path = obj_path
+        self.chunks = iter(chunks)
+        self.current = None
+
+    def read(self, size=-1):
+        data = b''
+        while size < 0 or len(data) < size:
+            if self.current is None:
+                chunk = next(self.chunks, None)
+                if chunk is None:
+                    break
+                self.current = self.blob.open_content(os.path.join(self.obj_path, chunk[0]))
+
+            buf = self.current.read(-1 if size < 0 else size - len(data))
+            if not buf:
+                self.current.close()
+                self.current = None
+            data += buf
+
+        return data
+
+    def close(self):
+        if self.current is not None:
+            self.current.close()
+            self.current = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
 class Tree(NgcObject):
     """
     Tree object will represent the structure of the repository. It will
@@ -156,23 +502,40 @@ class Tree(NgcObject):
     FILES = 'files'
     SUBDIRS = 'subdirs'
 
-    def __init__(self, path=None):
+    def __init__(self, path=None, config=None, hash_name=None):
         if not path: path = os.getcwd()
+        if hash_name is None: hash_name = RepoFormat(path).get(RepoFormat.HASH)
+        super().__init__(hash_name)
         self.path = path
         self.objects_path = os.path.join(self.path, '.ngc/objects')
         # if not os.path.exists(self.objects_path): os.makedirs(self.objects_path)
         self.current_tree_hash = None
-        self.blob = Blob()
+        if config is None: config = Config(self.path)
+        self.blob = Blob(config, hash_name)
 
-    def create(self, path=None):
+    def create(self, path=None, sparse=None, base_hash=None, rel_path=''):
+        """
+        Create tree objects for the directory and its subdirectories.
+        With sparse patterns given, paths outside of them are not read from
+        the directory but taken over from the tree object base_hash.
+        """
         if not path: path = self.path
         tree_obj = dict()
         files = dict()
         subdirs = dict()
+        base_files, base_subdirs = dict(), dict()
+        if sparse is not None and base_hash is not None:
+            base_dict = self.get_tree_dict(base_hash)
+            base_files = base_dict[self.FILES]
+            base_subdirs = base_dict[self.SUBDIRS]
         log.debug("generating tree object...")
 
+        items = list()
+        if sparse is None or os.path.isdir(path):
+            items = os.listdir(path)
+
         # traverse repository and generate blob files
-        for item in os.listdir(path):
+        for item in items:
             log.debug("traversing: %s" % (path))
             # log.debug("item - %s" % (item))
             item_path = os.path.join(path, item)
@@ -182,45 +545,73 @@ class Tree(NgcObject):
                 continue
 
             if os.path.isfile(item_path):
+                if sparse is not None and not sparse.includes(rel_path + item):
+                    continue
+
                 # generate file's hash to use it as filename
                 file_hash = self.blob.get_file_hash(item_path)
 
                 # if item not already creates as blob, create it
                 if not os.path.exists(os.path.join(self.objects_path, file_hash)):
-                    file_hash = self.blob.create(item_path, self.objects_path)
+                    raw = True if self.blob.matches_raw_patterns(rel_path + item) else None
+                    file_hash = self.blob.create(item_path, self.objects_path, raw=raw)
                     log.debug("blob created for: %s" % (item))
 
                 files[item] = file_hash
 
             elif os.path.isdir(item_path):
+                if sparse is not None and not sparse.overlaps(rel_path + item):
+                    continue
 
                 # if item is a directory, recursively create another tree object
-                subdir_hash = self.create(item_path)
+                subdir_hash = self.create(item_path, sparse, base_subdirs.get(item), rel_path + item + "/")
                 subdirs[item] = subdir_hash
                 log.info("tree created for: %s" % (item))
 
             else:
                 log.warning("Unknown file type found. Skipping.")
 
+        # take over whatever lies outside of the sparse checkout
+        for item, file_hash in base_files.items():
+            if item not in files and not sparse.includes(rel_path + item):
+                files[item] = file_hash
+        for item, subdir_hash in base_subdirs.items():
+            if item in subdirs or sparse.includes(rel_path + item):
+                continue
+            if not sparse.overlaps(rel_path + item):
+                subdirs[item] = subdir_hash
+            else:
+                # partially selected directory missing from the working tree
+                subdirs[item] = self.create(os.path.join(path, item), sparse, subdir_hash, rel_path + item + "/")
+
         # fill tree_obj with blob info
         tree_obj[self.FILES] = files
         tree_obj[self.SUBDIRS] = subdirs
 
-        # convert dict to json stream
-        tree_json = json.dumps(tree_obj)
+        hashed_value = self.write_tree_dict(tree_obj)
+
+        self.current_tree_hash = hashed_value # TODO: worst jugad ever, resolve testing for this
+
+        return hashed_value
+
+    def write_tree_dict(self, tree_obj):
+        """ Write a tree object from its dict, unless it exists already, and return its hash. """
+        # convert dict to json stream, with sorted keys so that the same
+        # content hashes the same whichever order its entries were found in
+        tree_json = json.dumps(tree_obj, sort_keys=True)
         tree_json_bytes = tree_json.encode()
 
         # write tree obj to file
-        hashf = hashlib.new(self.HASHING_FUNCTION)
+        hashf = self.new_hash()
         hashf.update(tree_json_bytes)
         hashed_value = hashf.hexdigest()
         tree_obj_path = os.path.join(self.objects_path, hashed_value)
 
         # TODO: why am I not using json.dump instead of this?
-        with open(tree_obj_path, 'wb') as tree_file:
-            tree_file.write(tree_json_bytes)
-
-        self.current_tree_hash = hashed_value # TODO: worst jugad ever, resolve testing for this
+        # objects can be hardlinked into other repositories, never rewrite them
+        if not os.path.exists(tree_obj_path):
+            with self.atomic_write(tree_obj_path) as tree_file:
+                tree_file.write(tree_json_bytes)
 
         return hashed_value
 
@@ -237,6 +628,28 @@ class Tree(NgcObject):
 
         return tree_dict
 
+    def resolve_path(self, tree_hash, rel_path):
+        """
+        Look up a repo-relative path in a tree, returning the kind and hash
+        of the object found there, or (None, None) if it doesn't exist.
+        Only the trees along the path are read.
+        """
+        parts = [part for part in rel_path.split("/") if part]
+        if not parts:
+            return TREE, tree_hash
+
+        for part in parts[:-1]:
+            tree_hash = self.get_tree_dict(tree_hash)[self.SUBDIRS].get(part)
+            if tree_hash is None:
+                return None, None
+
+        tree_dict = self.get_tree_dict(tree_hash)
+        if parts[-1] in tree_dict[self.FILES]:
+            return BLOB, tree_dict[self.FILES][parts[-1]]
+        if parts[-1] in tree_dict[self.SUBDIRS]:
+            return TREE, tree_dict[self.SUBDIRS][parts[-1]]
+        return None, None
+
 
 class Commit(NgcObject):
     """
@@ -251,8 +664,10 @@ class Commit(NgcObject):
     COMMITTER = 'committer'
     MSG = 'message'
 
-    def __init__(self, path=None):
+    def __init__(self, path=None, hash_name=None):
         if not path: path = os.getcwd()
+        if hash_name is None: hash_name = RepoFormat(path).get(RepoFormat.HASH)
+        super().__init__(hash_name)
         self.path = path
         self.objects_path = os.path.join(path, ".ngc/objects")
         # if not os.path.exists(self.objects_path): os.makedirs(self.objects_path)
@@ -297,12 +712,12 @@ class Commit(NgcObject):
         commit_json_bytes = commit_json.encode()
 
         # write commit_obj json to file
-        hashf = hashlib.new(self.HASHING_FUNCTION)
+        hashf = self.new_hash()
         hashf.update(commit_json_bytes)
         hashed_value = hashf.hexdigest()
         commit_obj_path = os.path.join(self.objects_path, hashed_value)
 
-        with open(commit_obj_path, 'wb') as tree_file:
+        with self.atomic_write(commit_obj_path) as tree_file:
             tree_file.write(commit_json_bytes)
 
         return hashed_value
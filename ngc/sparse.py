@@ -0,0 +1,78 @@
+import fnmatch
+import logging
+import os
+
+log = logging.getLogger(__name__)
+
+class Sparse:
+    """
+    Sparse checkout patterns of a repository, stored one per line in
+    .ngc/sparse. A pattern is a '/' separated path relative to the repository
+    root whose components may use shell-style wildcards. A pattern selects
+    the matching path and everything under it.
+    With no patterns stored, every path is selected.
+    """
+
+    def __init__(self, path=None):
+        if not path: path = os.getcwd()
+        self.sparse_path = os.path.join(path, '.ngc/sparse')
+        self.patterns = self._load_patterns()
+
+    @property
+    def enabled(self):
+        return bool(self.patterns)
+
+    def set_patterns(self, patterns):
+        """ Store the given patterns, replacing the previous ones. """
+        self.patterns = [self._split(pattern) for pattern in patterns if pattern.strip("/")]
+
+        with open(self.sparse_path, 'w') as sparse_file:
+            for pattern in self.patterns:
+                sparse_file.write("/".join(pattern) + "\n")
+
+    def disable(self):
+        """ Remove all patterns so that the whole tree is selected again. """
+        self.patterns = list()
+        if os.path.exists(self.sparse_path):
+            os.remove(self.sparse_path)
+
+    def includes(self, rel_path):
+        """ Check if the path itself is selected by a pattern. """
+        if not self.patterns: return True
+        parts = self._split(rel_path)
+
+        for pattern in self.patterns:
+            if len(parts) >= len(pattern) and self._match(parts, pattern):
+                return True
+        return False
+
+    def overlaps(self, rel_path):
+        """ Check if the directory could contain a selected path. """
+        if not self.patterns: return True
+        parts = self._split(rel_path)
+
+        for pattern in self.patterns:
+            if self._match(parts, pattern):
+                return True
+        return False
+
+    def _load_patterns(self):
+        patterns = list()
+        if os.path.exists(self.sparse_path):
+            with open(self.sparse_path, 'r') as sparse_file:
+                for line in sparse_file:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        patterns.append(self._split(line))
+        log.debug("sparse patterns: %s" % (patterns))
+        return patterns
+
+    def _match(self, parts, pattern):
+        """ Match the leading components that both the path and pattern have. """
+        for part, pattern_part in zip(parts, pattern):
+            if not fnmatch.fnmatchcase(part, pattern_part):
+                return False
+        return True
+
+    def _split(self, path):
+        return [part for part in path.strip().split("/") if part]
@@ -0,0 +1,99 @@
+import logging
+import os
+
+from . import objects
+from .objects import BLOB, COMMIT, TREE
+
+log = logging.getLogger(__name__)
+
+class Transfer:
+    """
+    Transfer of the objects reachable from a commit between two repositories
+    on the same host. Only objects missing from the destination are
+    transferred, and they are hardlinked where possible, so that they take
+    no extra disk space. Objects are immutable once written, which makes
+    sharing them between repositories safe.
+    """
+
+    def __init__(self, src_path, dst_path):
+        self.src_objects_path = os.path.join(src_path, '.ngc/objects')
+        self.dst_objects_path = os.path.join(dst_path, '.ngc/objects')
+        self.obj_blob = objects.Blob()
+        self.obj_tree = objects.Tree(src_path)
+        self.obj_commit = objects.Commit(src_path)
+
+    def missing_objects(self, commit_hash):
+        """
+        List the objects reachable from the commit that the destination lacks,
+        every object after the ones it refers to. As objects are transferred
+        in that order, a tree or commit present in the destination always has
+        everything below it too, and the walk doesn't descend into it.
+        """
+        missing = list()
+        seen = set()
+        stack = [(COMMIT, commit_hash, False)]
+
+        while stack:
+            kind, name, expanded = stack.pop()
+            if expanded:
+                missing.append(name)
+                continue
+            if name in seen or os.path.exists(os.path.join(self.dst_objects_path, name)):
+                continue
+            seen.add(name)
+
+            stack.append((kind, name, True))
+            stack.extend((child_kind, child, False) for child_kind, child in self._get_children(kind, name))
+
+        return missing
+
+    def transfer(self, commit_hash):
+        """ Transfer the missing objects, returning how many were linked and copied. """
+        linked = copied = 0
+
+        for name in self.missing_objects(commit_hash):
+            # a raw blob's header goes first, so that the blob is never seen without it
+            for file_name in (name + objects.Blob.HEADER_SUFFIX, name):
+                src = os.path.join(self.src_objects_path, file_name)
+                if not os.path.exists(src):
+                    continue
+                if self._link(src, os.path.join(self.dst_objects_path, file_name)):
+                    linked += 1
+                else:
+                    copied += 1
+
+        log.debug("%d objects linked, %d copied" % (linked, copied))
+        return linked, copied
+
+    def _get_children(self, kind, name):
+        """ Get the kind and name of the objects directly referred to by an object. """
+        if kind == COMMIT:
+            commit_dict = self.obj_commit.get_commit_dict_from_file(name)
+            yield TREE, commit_dict[self.obj_commit.TREE]
+            if self.obj_commit.PARENT in commit_dict:
+                yield COMMIT, commit_dict[self.obj_commit.PARENT]
+        elif kind == TREE:
+            tree_dict = self.obj_tree.get_tree_dict(name)
+            for blob_hash in tree_dict[self.obj_tree.FILES].values():
+                yield BLOB, blob_hash
+            for subdir_hash in tree_dict[self.obj_tree.SUBDIRS].values():
+                yield TREE, subdir_hash
+        else:
+            manifest = self.obj_blob.get_manifest(os.path.join(self.src_objects_path, name))
+            if manifest is not None:
+                for chunk_hash, _ in manifest[self.obj_blob.CHUNKS]:
+                    yield BLOB, chunk_hash
+
+    def _link(self, src, dst):
+        """ Hardlink an object, falling back to a (reflinked where possible) copy. """
+        try:
+            os.link(src, dst)
+            return True
+        except FileExistsError:
+            return True
+        except OSError as err:
+            log.debug("hardlink of %s failed: %s" % (src, err))
+
+        with open(src, 'rb') as f_in, self.obj_blob.atomic_write(dst) as f_out:
+            self.obj_blob.copy_fileobj(f_in, f_out)
+        return False
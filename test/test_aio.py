@@ -0,0 +1,95 @@
+import asyncio
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from distutils.dir_util import copy_tree
+from io import StringIO
+
+from ngc import commands
+from ngc.aio import AsyncRepository
+
+
+class AsyncRepositoryTest(unittest.TestCase):
+
+    def test_commit_status_and_show(self):
+
+        async def run(repo):
+            await repo.init()
+            first_commit = await repo.commit("first commit")
+            self.assertEqual([change async for change in repo.status()], [])
+
+            with open(repo.repo_path + '/file1', 'a') as file1:
+                file1.write("An addition.\n")
+            changes = [change async for change in repo.status()]
+            self.assertEqual([(change.path, change.kind) for change in changes], [('file1', commands.MODIFIED)])
+
+            # concurrent commits are serialized, the second one finds nothing to commit
+            second_commit, third_commit = await asyncio.gather(repo.commit("second commit"),
+                                                               repo.commit("third commit"))
+            self.assertIsNotNone(second_commit)
+            self.assertIsNone(third_commit)
+
+            content = b''.join([chunk async for chunk in repo.show(first_commit, 'file1')])
+            self.assertNotIn(b"An addition.", content)
+            output = StringIO()
+            with redirect_stdout(output), self.assertRaises(FileNotFoundError):
+                [chunk async for chunk in repo.show(first_commit, 'missing')]
+            self.assertEqual(output.getvalue(), "")
+
+            blamed_lines = await repo.blame('file1')
+            self.assertEqual(blamed_lines[-1], (second_commit, b"An addition.\n"))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            copy_tree('./test/test_dir/', temp_dir)
+            commands.Command(temp_dir).config_user('<genericname>', '<genericemail>')
+
+            asyncio.run(run(AsyncRepository(temp_dir)))
+
+    def test_commit_from_elsewhere(self):
+
+        async def run(repo, temp_dir):
+            await repo.init()
+            await repo.commit("first commit")
+
+            # another process commits behind the back of the repository
+            with open(temp_dir + '/file1', 'w') as file1:
+                file1.write("Committed elsewhere.\n")
+            other_commit = commands.Command(temp_dir).commit("second commit")
+
+            self.assertEqual([change async for change in repo.status()], [])
+            content = b''.join([chunk async for chunk in repo.show(None, 'file1')])
+            self.assertEqual(content, b"Committed elsewhere.\n")
+            await repo.checkout()
+            with open(temp_dir + '/file1') as file1:
+                self.assertEqual(file1.read(), "Committed elsewhere.\n")
+            self.assertEqual((await repo.command()).head, other_commit)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            copy_tree('./test/test_dir/', temp_dir)
+            commands.Command(temp_dir).config_user('<genericname>', '<genericemail>')
+
+            with redirect_stdout(StringIO()):
+                asyncio.run(run(AsyncRepository(temp_dir), temp_dir))
+
+    def test_stream_stopped_early(self):
+
+        async def run(repo):
+            # a slow consumer holds the producer back instead of buffering everything
+            emitted = list()
+
+            def produce(emit):
+                for i in range(1000):
+                    emit(i)
+                    emitted.append(i)
+
+            stream = repo._stream(produce)
+            async for i in stream:
+                break
+            await stream.aclose()
+            await asyncio.sleep(0.1)
+            self.assertLess(len(emitted), 1000)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo = AsyncRepository(temp_dir)
+            repo.QUEUE_SIZE = 4
+            asyncio.run(run(repo))
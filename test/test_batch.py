@@ -0,0 +1,45 @@
+import json
+import os
+import tempfile
+import unittest
+from distutils.dir_util import copy_tree
+from io import StringIO
+
+from ngc import commands
+from ngc.batch import Batch
+
+
+class BatchTest(unittest.TestCase):
+
+    def test_status_and_commit(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo_paths = list()
+            for i in range(3):
+                repo_path = os.path.join(temp_dir, f"repo{i}")
+                copy_tree('./test/test_dir/', repo_path)
+                cmd = commands.Command(repo_path)
+                cmd.config_user('<genericname>', '<genericemail>')
+                cmd.init()
+                repo_paths.append(repo_path)
+            missing_path = os.path.join(temp_dir, "missing")
+
+            batch = Batch(repo_paths + [missing_path], jobs=2)
+            with self.assertRaises(ValueError):
+                batch.run(Batch.COMMIT, out=StringIO())
+            out = StringIO()
+            self.assertEqual(batch.run(Batch.COMMIT, message="nightly", out=out), 1)
+            results = {result['repo']: result for result in map(json.loads, out.getvalue().splitlines())}
+            self.assertEqual(len(results), 4)
+            self.assertIn('error', results[missing_path])
+            for repo_path in repo_paths:
+                self.assertEqual(results[repo_path]['commit'], commands.Command(repo_path).head)
+
+            with open(os.path.join(repo_paths[1], 'file1'), 'a') as file1:
+                file1.write("An addition.\n")
+            out = StringIO()
+            self.assertEqual(Batch(repo_paths).run(Batch.STATUS, out=out), 0)
+            results = {result['repo']: result for result in map(json.loads, out.getvalue().splitlines())}
+            self.assertEqual(results[repo_paths[0]]['changes'], [])
+            self.assertEqual([change['path'] for change in results[repo_paths[1]]['changes']], ['file1'])
+
@@ -0,0 +1,28 @@
+import io
+import os
+import unittest
+
+from ngc.chunker import Chunker
+
+
+class ChunkerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.chunker = Chunker(min_size=1024, avg_size=4096, max_size=16384)
+        self.data = os.urandom(256 * 1024)
+
+    def test_chunks(self):
+        chunks = list(self.chunker.chunks(io.BytesIO(self.data)))
+
+        self.assertEqual(b''.join(chunks), self.data)
+        for chunk in chunks[:-1]:
+            self.assertGreaterEqual(len(chunk), 1024)
+            self.assertLessEqual(len(chunk), 16384)
+
+    def test_insertion_keeps_chunks(self):
+        chunks = list(self.chunker.chunks(io.BytesIO(self.data)))
+        modified_data = self.data[:100000] + b'X' + self.data[100000:]
+        modified_chunks = list(self.chunker.chunks(io.BytesIO(modified_data)))
+
+        # only the chunks around the insertion differ
+        self.assertLessEqual(len(set(modified_chunks) - set(chunks)), 3)
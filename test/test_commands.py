@@ -1,13 +1,19 @@
 import json
 import os
+import re
+import tarfile
 import tempfile
+import threading
 import unittest
+import zipfile
 from contextlib import redirect_stdout
 from distutils.dir_util import copy_tree
 from pathlib import Path
-from io import StringIO
+from io import BytesIO, StringIO
 
 from ngc import commands
+from ngc.blame import Blame
+from ngc.diff import Diff
 
 
 class InitTest(unittest.TestCase):
@@ -61,9 +67,9 @@ class CommitTest(unittest.TestCase):
             cmd.init()
             cmd.commit("first commit")
 
-            tree_file_path = os.path.join(cmd.obj_tree.objects_path, "0fbd657ff0d946213275023ae722c244c3026682")
+            tree_file_path = os.path.join(cmd.obj_tree.objects_path, "d25c3e80086290de5fb0c5ebc6c81ef0685870c3")
             self.assertTrue(os.path.exists(tree_file_path))
-            self.assertEqual(cmd.obj_tree.current_tree_hash, "0fbd657ff0d946213275023ae722c244c3026682")
+            self.assertEqual(cmd.obj_tree.current_tree_hash, "d25c3e80086290de5fb0c5ebc6c81ef0685870c3")
 
     def test_commit_with_file_modification(self):
         
@@ -80,9 +86,9 @@ class CommitTest(unittest.TestCase):
 
             cmd.commit("second commit with modification")
 
-            tree_file_path = os.path.join(cmd.obj_tree.objects_path, "7b58e3728ac207ec2ff18f8e374688b893eaed4f")
+            tree_file_path = os.path.join(cmd.obj_tree.objects_path, "bbdd1174f7112e12879d4444ef8b652e871b6afa")
             self.assertTrue(os.path.exists(tree_file_path))
-            self.assertEqual(cmd.obj_tree.current_tree_hash, "7b58e3728ac207ec2ff18f8e374688b893eaed4f")
+            self.assertEqual(cmd.obj_tree.current_tree_hash, "bbdd1174f7112e12879d4444ef8b652e871b6afa")
 
     def test_commit_with_file_deletion(self):
 
@@ -98,9 +104,9 @@ class CommitTest(unittest.TestCase):
 
             cmd.commit("second commit with file deletion")
 
-            tree_file_path = os.path.join(cmd.obj_tree.objects_path, "1ee7866845063cea765805d6bee24b964cc3505d")
+            tree_file_path = os.path.join(cmd.obj_tree.objects_path, "2e5ba07c0cc1f1052fd91741f9bdde8ef68b654c")
             self.assertTrue(os.path.exists(tree_file_path))
-            self.assertEqual(cmd.obj_tree.current_tree_hash, "1ee7866845063cea765805d6bee24b964cc3505d")
+            self.assertEqual(cmd.obj_tree.current_tree_hash, "2e5ba07c0cc1f1052fd91741f9bdde8ef68b654c")
 
     def test_commit_without_changes(self):
 
@@ -116,4 +122,636 @@ class CommitTest(unittest.TestCase):
             with redirect_stdout(output):
                 cmd.commit("second commit with no changes")
             
-            self.assertEqual(output.getvalue(), "No changes detected, nothing to commit.\n")
\ No newline at end of file
+            self.assertEqual(output.getvalue(), "No changes detected, nothing to commit.\n")
+
+class StatusTest(unittest.TestCase):
+
+    def test_iter_status(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            copy_tree('./test/test_dir/', temp_dir)
+
+            cmd = commands.Command(temp_dir)
+            cmd.config_user('<genericname>', '<genericemail>')
+            cmd.init()
+            cmd.commit("first commit")
+
+            with open(temp_dir + '/subdir1/file2', 'a') as file2:
+                file2.write("An addition.\n")
+            os.remove(temp_dir + '/subdir2/subdir3/file4')
+            os.makedirs(temp_dir + '/subdir4')
+            with open(temp_dir + '/subdir4/file5', 'w') as file5:
+                file5.write("A new file.\n")
+
+            changes = {(change.path, change.kind) for change in cmd.iter_status()}
+            expected_changes = {
+                ('subdir1/file2', commands.MODIFIED),
+                ('subdir2/subdir3/file4', commands.DELETED),
+                ('subdir4/file5', commands.ADDED),
+            }
+            self.assertEqual(changes, expected_changes)
+
+    def test_status_porcelain(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            copy_tree('./test/test_dir/', temp_dir)
+
+            cmd = commands.Command(temp_dir)
+            cmd.config_user('<genericname>', '<genericemail>')
+            cmd.init()
+            cmd.commit("first commit")
+
+            os.remove(temp_dir + '/file1')
+
+            output = StringIO()
+            with redirect_stdout(output):
+                cmd.status(porcelain=True)
+            records = [json.loads(line) for line in output.getvalue().splitlines()]
+
+            self.assertEqual(len(records), 1)
+            self.assertEqual(records[0]['path'], 'file1')
+            self.assertEqual(records[0]['kind'], commands.DELETED)
+            self.assertIsNone(records[0]['new_hash'])
+
+
+class DiffTest(unittest.TestCase):
+
+    def test_diff_long_file(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            copy_tree('./test/test_dir/', temp_dir)
+            lines = [f"line {line_no}\n" for line_no in range(3000)]
+            with open(temp_dir + '/long', 'w') as long_file:
+                long_file.writelines(lines)
+
+            cmd = commands.Command(temp_dir)
+            cmd.config_user('<genericname>', '<genericemail>')
+            cmd.init()
+            cmd.commit("first commit")
+
+            lines[1500] = "changed line\n"
+            with open(temp_dir + '/long', 'w') as long_file:
+                long_file.writelines(lines)
+
+            output = StringIO()
+            with redirect_stdout(output):
+                cmd.diff()
+            diff_lines = output.getvalue().splitlines()
+            self.assertIn("-line 1500", diff_lines)
+            self.assertIn("+changed line", diff_lines)
+            self.assertIn(" line 1499", diff_lines)
+            self.assertEqual(len([line for line in diff_lines if line[:1] in "-+" and not line.startswith("--")]), 2)
+
+    def test_diff_too_large(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            copy_tree('./test/test_dir/', temp_dir)
+            with open(temp_dir + '/large', 'w') as large_file:
+                large_file.write("line\n" * (Diff.MAX_SIZE // 5 + 1))
+
+            cmd = commands.Command(temp_dir)
+            cmd.config_user('<genericname>', '<genericemail>')
+            cmd.init()
+            cmd.commit("first commit")
+
+            with open(temp_dir + '/large', 'a') as large_file:
+                large_file.write("another line\n")
+
+            output = StringIO()
+            with redirect_stdout(output):
+                cmd.diff()
+            self.assertIn("Files too large to diff", output.getvalue())
+
+
+class SparseTest(unittest.TestCase):
+
+    def test_sparse_checkout(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            copy_tree('./test/test_dir/', temp_dir)
+
+            cmd = commands.Command(temp_dir)
+            cmd.config_user('<genericname>', '<genericemail>')
+            cmd.init()
+            cmd.commit("first commit")
+
+            with redirect_stdout(StringIO()):
+                cmd.set_sparse(['subdir2/subdir3'])
+            cmd.checkout()
+
+            self.assertTrue(os.path.exists(temp_dir + '/subdir2/subdir3/file4'))
+            self.assertFalse(os.path.exists(temp_dir + '/file1'))
+            self.assertFalse(os.path.exists(temp_dir + '/subdir1/file2'))
+            self.assertFalse(os.path.exists(temp_dir + '/subdir2/file3'))
+            self.assertEqual(list(cmd.iter_status()), [])
+
+    def test_sparse_commit_keeps_unselected_paths(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            copy_tree('./test/test_dir/', temp_dir)
+
+            cmd = commands.Command(temp_dir)
+            cmd.config_user('<genericname>', '<genericemail>')
+            cmd.init()
+            cmd.commit("first commit")
+
+            with redirect_stdout(StringIO()):
+                cmd.set_sparse(['subdir1'])
+            cmd.checkout()
+            with open(temp_dir + '/subdir1/file2', 'a') as file2:
+                file2.write("An addition.\n")
+            cmd.commit("second commit")
+
+            with redirect_stdout(StringIO()):
+                cmd.disable_sparse()
+            cmd.checkout()
+
+            self.assertTrue(os.path.exists(temp_dir + '/file1'))
+            self.assertTrue(os.path.exists(temp_dir + '/subdir2/subdir3/file4'))
+            with open(temp_dir + '/subdir1/file2') as file2:
+                self.assertTrue(file2.read().endswith("An addition.\n"))
+
+
+class FsckTest(unittest.TestCase):
+
+    def test_fsck(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            copy_tree('./test/test_dir/', temp_dir)
+
+            cmd = commands.Command(temp_dir)
+            cmd.config_user('<genericname>', '<genericemail>')
+            cmd.init()
+            cmd.commit("first commit")
+
+            with redirect_stdout(StringIO()):
+                self.assertEqual(cmd.fsck(jobs=2), 0)
+
+            # corrupt a blob and remove a tree
+            tree_dict = cmd.obj_tree.get_tree_dict(cmd.obj_commit.get_tree_hash(cmd.head))
+            blob_path = os.path.join(cmd.obj_tree.objects_path, tree_dict['files']['file1'])
+            cmd.obj_blob.create(temp_dir + '/subdir1/file2', temp_dir)
+            os.replace(os.path.join(temp_dir, cmd.obj_blob.get_file_hash(temp_dir + '/subdir1/file2')), blob_path)
+            os.remove(os.path.join(cmd.obj_tree.objects_path, tree_dict['subdirs']['subdir1']))
+
+            output = StringIO()
+            with redirect_stdout(output):
+                self.assertEqual(cmd.fsck(jobs=2), 2)
+            self.assertIn(tree_dict['files']['file1'], output.getvalue())
+            self.assertIn("missing tree " + tree_dict['subdirs']['subdir1'], output.getvalue())
+
+    def test_fsck_incremental(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            copy_tree('./test/test_dir/', temp_dir)
+
+            cmd = commands.Command(temp_dir)
+            cmd.config_user('<genericname>', '<genericemail>')
+            cmd.init()
+            cmd.commit("first commit")
+            with redirect_stdout(StringIO()):
+                cmd.fsck()
+
+            with open(temp_dir + '/file1', 'a') as file1:
+                file1.write("An addition.\n")
+            cmd.commit("second commit")
+
+            output = StringIO()
+            with redirect_stdout(output):
+                self.assertEqual(cmd.fsck(incremental=True), 0)
+            # the new blob, root tree and commit
+            self.assertIn("Verified 3 objects", output.getvalue())
+
+    def test_fsck_missing_chunk(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            copy_tree('./test/test_dir/', temp_dir)
+            with open(temp_dir + '/large', 'wb') as large_file:
+                large_file.write(os.urandom(5 * 1024 * 1024))
+
+            cmd = commands.Command(temp_dir)
+            cmd.config_user('<genericname>', '<genericemail>')
+            cmd.init()
+            cmd.config_repo('chunk_threshold', '1024')
+            cmd.commit("first commit")
+            with redirect_stdout(StringIO()):
+                cmd.fsck()
+
+            tree_dict = cmd.obj_tree.get_tree_dict(cmd.obj_commit.get_tree_hash(cmd.head))
+            manifest = cmd.obj_blob.get_manifest(os.path.join(cmd.obj_tree.objects_path, tree_dict['files']['large']))
+            chunk_hash = manifest['chunks'][0][0]
+            os.remove(os.path.join(cmd.obj_tree.objects_path, chunk_hash))
+            with open(temp_dir + '/file1', 'a') as file1:
+                file1.write("An addition.\n")
+            cmd.commit("second commit")
+
+            output = StringIO()
+            with redirect_stdout(output):
+                self.assertEqual(cmd.fsck(incremental=True), 1)
+            self.assertIn("missing blob " + chunk_hash, output.getvalue())
+
+
+class CloneTest(unittest.TestCase):
+
+    def test_clone_and_fetch(self):
+
+        with tempfile.TemporaryDirectory() as src_dir, tempfile.TemporaryDirectory() as temp_dir:
+            copy_tree('./test/test_dir/', src_dir)
+
+            src_cmd = commands.Command(src_dir)
+            src_cmd.config_user('<genericname>', '<genericemail>')
+            src_cmd.init()
+            src_cmd.commit("first commit")
+
+            dst_dir = os.path.join(temp_dir, 'clone')
+            cmd = commands.Command(dst_dir)
+            with redirect_stdout(StringIO()):
+                cmd.clone(src_dir)
+
+            self.assertEqual(cmd.head, src_cmd.head)
+            with open(dst_dir + '/subdir2/subdir3/file4') as file4:
+                self.assertEqual(file4.read(), open(src_dir + '/subdir2/subdir3/file4').read())
+            self.assertEqual(list(cmd.iter_status()), [])
+            # objects are shared rather than copied
+            head_path = os.path.join(cmd.obj_tree.objects_path, cmd.head)
+            self.assertTrue(os.path.samefile(head_path, os.path.join(src_cmd.obj_tree.objects_path, cmd.head)))
+
+            with open(src_dir + '/file1', 'a') as file1:
+                file1.write("An addition.\n")
+            src_cmd.commit("second commit")
+
+            with redirect_stdout(StringIO()):
+                cmd.fetch(src_dir)
+            self.assertTrue(os.path.exists(os.path.join(cmd.obj_tree.objects_path, src_cmd.head)))
+            self.assertEqual(cmd.obj_commit.get_commit_dict_from_file(src_cmd.head)['message'], "second commit")
+
+    def test_clone_into_non_empty_directory(self):
+
+        with tempfile.TemporaryDirectory() as src_dir, tempfile.TemporaryDirectory() as dst_dir:
+            copy_tree('./test/test_dir/', src_dir)
+
+            src_cmd = commands.Command(src_dir)
+            src_cmd.config_user('<genericname>', '<genericemail>')
+            src_cmd.init()
+            src_cmd.commit("first commit")
+
+            with open(dst_dir + '/precious.txt', 'w') as precious:
+                precious.write("keep me\n")
+            cmd = commands.Command(dst_dir)
+            with redirect_stdout(StringIO()):
+                cmd.clone(src_dir)
+
+            self.assertEqual(os.listdir(dst_dir), ['precious.txt'])
+            self.assertIsNone(cmd.head)
+
+
+class ArchiveTest(unittest.TestCase):
+
+    def test_archive(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            copy_tree('./test/test_dir/', temp_dir)
+
+            cmd = commands.Command(temp_dir)
+            cmd.config_user('<genericname>', '<genericemail>')
+            cmd.init()
+            first_commit = cmd.commit("first commit")
+            with open(temp_dir + '/file1', 'a') as file1:
+                file1.write("An addition.\n")
+            cmd.commit("second commit")
+
+            out = BytesIO()
+            cmd.archive(first_commit, out=out, archive_format='tar.gz')
+            out.seek(0)
+            with tarfile.open(fileobj=out) as tar_file:
+                self.assertTrue(tar_file.getmember('subdir2/subdir3').isdir())
+                self.assertEqual(tar_file.extractfile('subdir2/subdir3/file4').read(),
+                                 open(temp_dir + '/subdir2/subdir3/file4', 'rb').read())
+                self.assertNotIn(b"An addition.", tar_file.extractfile('file1').read())
+
+            out = BytesIO()
+            cmd.archive(out=out, archive_format='zip')
+            with zipfile.ZipFile(out) as zip_file:
+                self.assertIn('subdir1/', zip_file.namelist())
+                self.assertEqual(zip_file.read('file1'), open(temp_dir + '/file1', 'rb').read())
+            # the working tree is left alone
+            self.assertEqual(list(cmd.iter_status()), [])
+
+
+class PathLogTest(unittest.TestCase):
+
+    def test_log_paths(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            copy_tree('./test/test_dir/', temp_dir)
+
+            cmd = commands.Command(temp_dir)
+            cmd.config_user('<genericname>', '<genericemail>')
+            cmd.init()
+            first_commit = cmd.commit("first commit")
+            with open(temp_dir + '/file1', 'a') as file1:
+                file1.write("An addition.\n")
+            second_commit = cmd.commit("second commit")
+            with open(temp_dir + '/subdir2/subdir3/file4', 'a') as file4:
+                file4.write("An addition.\n")
+            third_commit = cmd.commit("third commit")
+
+            def logged_commits(paths):
+                output = StringIO()
+                with redirect_stdout(output):
+                    cmd.log(paths=paths)
+                return re.findall(r"^Commit: (\w+)$", output.getvalue(), re.MULTILINE)
+
+            self.assertEqual(logged_commits(None), [third_commit, second_commit, first_commit])
+            self.assertEqual(logged_commits(['subdir2']), [third_commit, first_commit])
+            self.assertEqual(logged_commits(['file1']), [second_commit, first_commit])
+            self.assertEqual(logged_commits(['subdir1/file2', 'missing']), [first_commit])
+
+
+class ShowTest(unittest.TestCase):
+
+    def test_show(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            copy_tree('./test/test_dir/', temp_dir)
+
+            cmd = commands.Command(temp_dir)
+            cmd.config_user('<genericname>', '<genericemail>')
+            cmd.init()
+            first_commit = cmd.commit("first commit")
+            original = open(temp_dir + '/subdir2/subdir3/file4', 'rb').read()
+            with open(temp_dir + '/subdir2/subdir3/file4', 'a') as file4:
+                file4.write("An addition.\n")
+            cmd.commit("second commit")
+
+            out = BytesIO()
+            self.assertTrue(cmd.show(first_commit, 'subdir2/subdir3/file4', out=out))
+            self.assertEqual(out.getvalue(), original)
+
+            out = BytesIO()
+            self.assertTrue(cmd.show(None, 'subdir2', out=out))
+            self.assertEqual(out.getvalue(), b"file3\nsubdir3/\n")
+
+            with redirect_stdout(StringIO()):
+                self.assertFalse(cmd.show(first_commit, 'subdir2/missing', out=BytesIO()))
+
+
+class BlameTest(unittest.TestCase):
+
+    def test_blame(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cmd = commands.Command(temp_dir)
+            cmd.config_user('<genericname>', '<genericemail>')
+            cmd.init()
+            with open(temp_dir + '/file1', 'w') as file1:
+                file1.write("a\nb\nc\n")
+            first_commit = cmd.commit("first commit")
+            with open(temp_dir + '/file1', 'w') as file1:
+                file1.write("a\nB\nc\nd\n")
+            second_commit = cmd.commit("second commit")
+            with open(temp_dir + '/file2', 'w') as file2:
+                file2.write("unrelated\n")
+            third_commit = cmd.commit("third commit")
+
+            blame = Blame(temp_dir)
+            # the third commit didn't touch file1 and is skipped
+            self.assertEqual(blame.versions(third_commit, 'file1'),
+                             [(second_commit, cmd.obj_tree.resolve_path(
+                                 cmd.obj_commit.get_tree_hash(third_commit), 'file1')[1]),
+                              (first_commit, cmd.obj_tree.resolve_path(
+                                  cmd.obj_commit.get_tree_hash(first_commit), 'file1')[1])])
+            expected = [(first_commit, b"a\n"), (second_commit, b"B\n"),
+                        (first_commit, b"c\n"), (second_commit, b"d\n")]
+            self.assertEqual(blame.run(third_commit, 'file1'), expected)
+            self.assertEqual(len(os.listdir(blame.cache_path)), 1)
+            # again from the cache
+            self.assertEqual(Blame(temp_dir).run(third_commit, 'file1'), expected)
+            self.assertIsNone(blame.run(first_commit, 'file2'))
+
+            output = StringIO()
+            with redirect_stdout(output):
+                cmd.blame('file1')
+            self.assertEqual(output.getvalue().splitlines()[1], f"{second_commit[:8]} (<genericname> 2) B")
+
+
+class FastImportTest(unittest.TestCase):
+
+    def test_fast_import(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cmd = commands.Command(temp_dir)
+            cmd.config_user('<genericname>', '<genericemail>')
+            cmd.init()
+
+            stream = BytesIO(b"commit\n"
+                             b"author Ann <ann@example.com>\n"
+                             b"data 5\nfirst\n"
+                             b"M 4 dir1/dir2/file1\nabc\n\n"
+                             b"M 4 dir3/file2\nxyz\n\n"
+                             b"commit\n"
+                             b"data 6\nsecond\n"
+                             b"D dir1/dir2/file1\n"
+                             b"M 4 file3\nnew\n\n")
+            with redirect_stdout(StringIO()):
+                first_commit, second_commit = cmd.fast_import(stream)
+            self.assertEqual(cmd.head, second_commit)
+            self.assertEqual(cmd.obj_commit.get_commit_dict_from_file(first_commit)['author'],
+                             {'user_name': 'Ann', 'user_email': 'ann@example.com'})
+
+            first_tree = cmd.obj_commit.get_tree_hash(first_commit)
+            second_tree = cmd.obj_commit.get_tree_hash(second_commit)
+            self.assertEqual(cmd.obj_tree.resolve_path(first_tree, 'dir1/dir2/file1')[0], commands.objects.BLOB)
+            # emptied directories are dropped, untouched ones keep their tree
+            self.assertEqual(cmd.obj_tree.resolve_path(second_tree, 'dir1'), (None, None))
+            self.assertEqual(cmd.obj_tree.resolve_path(second_tree, 'dir3'),
+                             cmd.obj_tree.resolve_path(first_tree, 'dir3'))
+            # nothing was written to the working tree
+            self.assertEqual(sorted(os.listdir(temp_dir)), ['.authorinfo', '.ngc'])
+
+            with redirect_stdout(StringIO()):
+                cmd.checkout()
+            with open(temp_dir + '/file3') as file3:
+                self.assertEqual(file3.read(), "new\n")
+            self.assertEqual(list(cmd.iter_status()), [])
+            # trees are serialized the same way as by a commit of the working tree
+            with redirect_stdout(StringIO()):
+                self.assertIsNone(cmd.commit("nothing changed"))
+
+            with redirect_stdout(StringIO()):
+                self.assertEqual(cmd.fast_import(BytesIO(b"commit\ndata 1\nx\nM 1 .hidden\nx\n")), [])
+            self.assertEqual(cmd.head, second_commit)
+
+
+class HashFunctionTest(unittest.TestCase):
+
+    def test_sha256_repository(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            copy_tree('./test/test_dir/', temp_dir)
+
+            cmd = commands.Command(temp_dir)
+            cmd.config_user('<genericname>', '<genericemail>')
+            cmd.init(hash_name='sha256')
+            cmd.commit("first commit")
+
+            # a new Command picks the hash function up from the repo format
+            cmd = commands.Command(temp_dir)
+            self.assertEqual(len(cmd.head), 64)
+            self.assertEqual(cmd.obj_blob.hash_name, 'sha256')
+            self.assertEqual(list(cmd.iter_status()), [])
+            with redirect_stdout(StringIO()):
+                self.assertEqual(cmd.fsck(), 0)
+
+    def test_hash_of_existing_repository(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            copy_tree('./test/test_dir/', temp_dir)
+
+            cmd = commands.Command(temp_dir)
+            cmd.config_user('<genericname>', '<genericemail>')
+            with redirect_stdout(StringIO()):
+                cmd.init(hash_name='md4sum')
+            self.assertFalse(os.path.exists(temp_dir + '/.ngc'))
+
+            cmd.init()
+            cmd.commit("first commit")
+            # a repository from before the format file was introduced
+            os.remove(temp_dir + '/.ngc/format')
+
+            cmd = commands.Command(temp_dir)
+            with redirect_stdout(StringIO()):
+                cmd.init(hash_name='sha256')
+            self.assertFalse(os.path.exists(temp_dir + '/.ngc/format'))
+            cmd = commands.Command(temp_dir)
+            self.assertEqual(cmd.obj_blob.hash_name, 'sha1')
+            self.assertEqual(list(cmd.iter_status()), [])
+
+
+class ConcurrencyTest(unittest.TestCase):
+
+    def test_concurrent_readers_and_writers(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            copy_tree('./test/test_dir/', temp_dir)
+
+            cmd = commands.Command(temp_dir)
+            cmd.config_user('<genericname>', '<genericemail>')
+            cmd.init()
+            cmd.commit("first commit")
+
+            writers_done = threading.Event()
+            commit_hashes = list()
+            errors = list()
+
+            def write(writer):
+                try:
+                    writer_cmd = commands.Command(temp_dir)
+                    for i in range(10):
+                        # files only appear complete, so trees never see them half written
+                        file_name = 'file_%d_%d' % (writer, i)
+                        temp_path = os.path.join(temp_dir, '.' + file_name)
+                        with open(temp_path, 'w') as new_file:
+                            new_file.write("writer %d, commit %d\n" % (writer, i))
+                        os.replace(temp_path, os.path.join(temp_dir, file_name))
+                        commit_hash = writer_cmd.commit("commit %d of writer %d" % (i, writer))
+                        if commit_hash is not None:
+                            commit_hashes.append(commit_hash)
+                except Exception as err:
+                    errors.append(err)
+
+            def read():
+                try:
+                    while not writers_done.is_set():
+                        reader_cmd = commands.Command(temp_dir)
+                        self.assertRegex(reader_cmd.head, re.compile('^[0-9a-f]{40}$'))
+                        commit_dict = reader_cmd.obj_commit.get_commit_dict_from_file(reader_cmd.head)
+                        reader_cmd.obj_tree.get_tree_dict(commit_dict['tree'])
+                        list(reader_cmd.iter_status())
+                        reader_cmd.log()
+                except Exception as err:
+                    errors.append(err)
+
+            readers = [threading.Thread(target=read) for _ in range(4)]
+            writers = [threading.Thread(target=write, args=(i,)) for i in range(4)]
+            with redirect_stdout(StringIO()):
+                for thread in readers + writers:
+                    thread.start()
+                for thread in writers:
+                    thread.join()
+                writers_done.set()
+                for thread in readers:
+                    thread.join()
+
+            self.assertEqual(errors, [])
+
+            # no commit got lost, history is linear from HEAD
+            history = list()
+            commit_hash = commands.Command(temp_dir).head
+            while commit_hash is not None:
+                history.append(commit_hash)
+                commit_hash = cmd.obj_commit.get_commit_dict_from_file(commit_hash).get('parent')
+            self.assertEqual(set(commit_hashes), set(history[:-1]))
+            self.assertFalse(os.path.exists(temp_dir + '/.ngc/HEAD.lock'))
+
+
+class RenameTest(unittest.TestCase):
+
+    def test_rename_and_copy_detection(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            copy_tree('./test/test_dir/', temp_dir)
+
+            cmd = commands.Command(temp_dir)
+            cmd.config_user('<genericname>', '<genericemail>')
+            cmd.init()
+            cmd.commit("first commit")
+
+            os.rename(temp_dir + '/subdir1/file2', temp_dir + '/file2')
+            copy_tree(temp_dir + '/subdir2/subdir3', temp_dir + '/subdir3')
+
+            changes = {(change.path, change.kind) for change in cmd.iter_status()}
+            self.assertEqual(changes, {
+                ('file2', commands.ADDED),
+                ('subdir1/file2', commands.DELETED),
+                ('subdir3/file4', commands.ADDED),
+            })
+
+            changes = {(change.path, change.kind, change.old_path)
+                       for change in cmd.iter_status(detect_renames=True)}
+            self.assertEqual(changes, {
+                ('file2', commands.RENAMED, 'subdir1/file2'),
+                ('subdir3/file4', commands.ADDED, None),
+            })
+
+            changes = {(change.path, change.kind, change.old_path)
+                       for change in cmd.iter_status(detect_copies=True)}
+            self.assertEqual(changes, {
+                ('file2', commands.RENAMED, 'subdir1/file2'),
+                ('subdir3/file4', commands.COPIED, 'subdir2/subdir3/file4'),
+            })
+
+    def test_similar_rename_detection(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            copy_tree('./test/test_dir/', temp_dir)
+            with open(temp_dir + '/file1', 'w') as file1:
+                file1.writelines("line %d\n" % i for i in range(100))
+
+            cmd = commands.Command(temp_dir)
+            cmd.config_user('<genericname>', '<genericemail>')
+            cmd.init()
+            cmd.commit("first commit")
+
+            os.rename(temp_dir + '/file1', temp_dir + '/file5')
+            with open(temp_dir + '/file5', 'a') as file5:
+                file5.write("one more line\n")
+
+            changes = {(change.path, change.kind) for change in cmd.iter_status()}
+            self.assertEqual(changes, {('file1', commands.DELETED), ('file5', commands.ADDED)})
+
+            changes = [change for change in cmd.iter_status(similarity=0.5)]
+            self.assertEqual(len(changes), 1)
+            self.assertEqual(changes[0].kind, commands.RENAMED)
+            self.assertEqual(changes[0].old_path, 'file1')
+            self.assertNotEqual(changes[0].old_hash, changes[0].new_hash)
@@ -6,7 +6,8 @@ from contextlib import redirect_stdout
 from distutils.dir_util import copy_tree
 from io import StringIO
 
-from ngc import objects
+from ngc import compression, objects
+from ngc.config import Config
 
 
 class BlobTest(unittest.TestCase):
@@ -78,18 +79,123 @@ class BlobTest(unittest.TestCase):
                     self.assertEqual(actual_hash, expected_hash)
                     blob_file.close()
 
+    def test_create_raw(self):
+
+        for data, expected_hash in self.data_to_hashed_name.items():
+            with tempfile.NamedTemporaryFile() as src_file:
+                src_file.write(data.encode())
+                src_file.seek(0)
+                with tempfile.TemporaryDirectory() as temp_dir:
+                    actual_hash = self.blob.create(src_file.name, temp_dir, raw=True)
+                    blob_path = os.path.join(temp_dir, actual_hash)
+                    dst_path = os.path.join(temp_dir, 'extracted')
+                    self.blob.extract_content(blob_path, dst_path)
+
+                    self.assertEqual(actual_hash, expected_hash)
+                    self.assertTrue(self.blob.is_raw(blob_path))
+                    self.assertEqual(self.blob.get_header(blob_path), "blob %d\x00" % len(data))
+                    self.assertEqual(self.blob.get_content(blob_path), data.encode())
+                    with open(dst_path, 'rb') as dst_file:
+                        self.assertEqual(dst_file.read(), data.encode())
+
+    def test_create_incompressible(self):
+
+        with tempfile.NamedTemporaryFile() as src_file:
+            src_file.write(os.urandom(2 * objects.Blob.RAW_MIN_SIZE))
+            src_file.seek(0)
+            with tempfile.TemporaryDirectory() as temp_dir:
+                actual_hash = self.blob.create(src_file.name, temp_dir)
+                self.assertTrue(self.blob.is_raw(os.path.join(temp_dir, actual_hash)))
+
+    def test_create_with_codecs(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(temp_dir + '/.ngc/objects')
+            objects_path = temp_dir + '/.ngc/objects'
+            config = Config(temp_dir)
+            blob_paths = dict()
+
+            for codec in compression.CODECS:
+                config.set(Config.COMPRESSION, codec)
+                config.set(Config.COMPRESSION_LEVEL, compression.LEVELS[codec][-1])
+                data = 'CONTENT FOR %s' % codec
+                with tempfile.NamedTemporaryFile() as src_file:
+                    src_file.write(data.encode())
+                    src_file.seek(0)
+                    blob_hash = objects.Blob(config).create(src_file.name, objects_path)
+                blob_paths[data] = os.path.join(objects_path, blob_hash)
+
+            # objects written with any codec are readable with the defaults
+            for data, blob_path in blob_paths.items():
+                self.assertEqual(self.blob.get_header(blob_path), "blob %d\x00" % len(data))
+                self.assertEqual(self.blob.get_content(blob_path), data.encode())
+
+    def test_create_chunked(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(temp_dir + '/.ngc/objects')
+            objects_path = temp_dir + '/.ngc/objects'
+            config = Config(temp_dir)
+            config.set(Config.CHUNK_THRESHOLD, 1)
+            blob = objects.Blob(config)
+
+            src_path = os.path.join(temp_dir, 'large')
+            data = os.urandom(5 * 1024 * 1024)
+            with open(src_path, 'wb') as src_file:
+                src_file.write(data)
+
+            blob_hash = blob.create(src_path, objects_path)
+            blob_path = os.path.join(objects_path, blob_hash)
+            dst_path = os.path.join(temp_dir, 'extracted')
+            blob.extract_content(blob_path, dst_path)
+
+            self.assertEqual(blob_hash, blob.get_file_hash(src_path))
+            self.assertIsNotNone(blob.get_manifest(blob_path))
+            self.assertEqual(blob.get_header(blob_path), "blob %d\x00" % len(data))
+            self.assertTrue(blob.compare_chunked(src_path, blob_path))
+            with open(dst_path, 'rb') as dst_file:
+                self.assertEqual(dst_file.read(), data)
+
+            with open(src_path, 'r+b') as src_file:
+                src_file.write(b'X')
+            self.assertFalse(blob.compare_chunked(src_path, blob_path))
+
+
+class ConfigTest(unittest.TestCase):
+
+    def test_set_validates_types(self):
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.makedirs(temp_dir + '/.ngc')
+            config = Config(temp_dir)
+
+            config.set(Config.RAW_PATTERNS, '*.png')
+            self.assertEqual(Config(temp_dir).get(Config.RAW_PATTERNS), ['*.png'])
+            self.assertTrue(objects.Blob(config).matches_raw_patterns('image.png'))
+            self.assertFalse(objects.Blob(config).matches_raw_patterns('notes.txt'))
+
+            for key, value in ((Config.RAW_PATTERNS, ['*.png', 1]), (Config.RAW_PATTERNS, {'*.png': 1}),
+                               (Config.RAW_MIN_RATIO, '1.5'), (Config.RAW_MIN_RATIO, -1),
+                               (Config.CHUNK_THRESHOLD, None), (Config.CHUNK_THRESHOLD, True)):
+                with self.assertRaises(ValueError):
+                    config.set(key, value)
+            config.set(Config.RAW_MIN_RATIO, 1.5)
+            config.set(Config.CHUNK_THRESHOLD, 0)
+            self.assertEqual(Config(temp_dir).get(Config.RAW_MIN_RATIO), 1.5)
+            self.assertEqual(Config(temp_dir).get(Config.RAW_PATTERNS), ['*.png'])
+
 
 class TreeTest(unittest.TestCase):
 
     def setUp(self):
-        self.subdir_to_hash = {'.':'0fbd657ff0d946213275023ae722c244c3026682',
+        self.subdir_to_hash = {'.':'d25c3e80086290de5fb0c5ebc6c81ef0685870c3',
                        'subdir1':'d2b945ace691fe8522e868ebde016d0a53ac40ca',
                        'subdir2':'35d9d594f1d830505fb3132d8959e73119755114',
                        'subdir2/subdir3':'17aeddcc4d19a24eedc6024163cdb9b0fceb5faa'
                     }
         self.hash_to_data = {
-            '0fbd657ff0d946213275023ae722c244c3026682': b'{"files": {"file1": "b75caba50711332063088fc53744f1c55b4445fe"}, '
-            b'"subdirs": {"subdir2": "35d9d594f1d830505fb3132d8959e73119755114", "subdir1": "d2b945ace691fe8522e868ebde016d0a53ac40ca"}}',
+            'd25c3e80086290de5fb0c5ebc6c81ef0685870c3': b'{"files": {"file1": "b75caba50711332063088fc53744f1c55b4445fe"}, '
+            b'"subdirs": {"subdir1": "d2b945ace691fe8522e868ebde016d0a53ac40ca", "subdir2": "35d9d594f1d830505fb3132d8959e73119755114"}}',
             'd2b945ace691fe8522e868ebde016d0a53ac40ca': b'{"files": {"file2": "bfc385898eb83d5f15e84635a1ab1649cced4fcb"}, "subdirs": {}}',
             '35d9d594f1d830505fb3132d8959e73119755114': b'{"files": {"file3": "41cd77870f7d97e5b5a32b87a12343312ffbc065"}, "subdirs": '
             b'{"subdir3": "17aeddcc4d19a24eedc6024163cdb9b0fceb5faa"}}',